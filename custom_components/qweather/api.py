@@ -1,27 +1,165 @@
-from collections.abc import Mapping
-from datetime import datetime, timedelta
+import asyncio
+from collections import deque
+from collections.abc import Collection, Mapping
+from datetime import date, datetime, timedelta
 import logging
 import math
+import time
+from typing import Any
 
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+from homeassistant.util.json import json_loads
 
 from .const import (
     AirNow,
     DailyForecast,
+    HistoricalHourly,
     HourlyForecast,
     IndicesDailyItem,
     MinutelyPrecipitation,
     RealtimeWeather,
+    SolarRadiation,
     WeatherWarning,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class QWeatherClient:
-    dev_api_v7 = "https://devapi.qweather.com/v7"
+class QWeatherError(Exception):
+    """No usable response, the reason has been logged by url_get, or is the message."""
+
+
+class RateLimiter:
+    """Limits bulk requests to `per_minute` in any minute, `concurrency` at once.
+
+    Usage: `async with limiter: ...`
+    """
+
+    def __init__(self, per_minute: int, concurrency: int) -> None:
+        self._per_minute = per_minute
+        self._sent: deque[float] = deque()
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self) -> None:
+        """Wait for a slot."""
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    while self._sent and self._sent[0] <= now - 60:
+                        self._sent.popleft()
+                    if len(self._sent) < self._per_minute:
+                        break
+                    await asyncio.sleep(self._sent[0] + 60 - now)
+                self._sent.append(now)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Release the slot."""
+        self._semaphore.release()
+
+
+def parse_hosts(text: str) -> list[str]:
+    """Hosts separated by commas or whitespace, URLs are reduced to their host."""
+    hosts = []
+    for item in text.replace(",", " ").split():
+        host = item.removeprefix("https://").removeprefix("http://").split("/")[0]
+        if host and host not in hosts:
+            hosts.append(host)
+    return hosts
+
+
+class HostPool:
+    """Candidate API hosts, the fastest healthy one first.
+
+    Latency is an exponentially weighted average over requests and health checks.
+    A failed host goes last for FAILURE_COOLDOWN, it is still tried when all
+    others fail too.
+    """
+
+    DEFAULT_HOST = "devapi.qweather.com"
+    # Served by geoapi.qweather.com, the per-account API hosts serve it at /geo.
+    LEGACY_HOSTS = frozenset({"devapi.qweather.com", "api.qweather.com"})
+
+    LATENCY_WEIGHT = 0.3
+    FAILURE_COOLDOWN = 300  # seconds
+    # Per attempt while other hosts are left to fail over to, the last attempt
+    # gets the session timeout.
+    ATTEMPT_TIMEOUT = ClientTimeout(total=6)
 
+    def __init__(self, hosts: list[str] | None = None) -> None:
+        self.hosts = hosts or [self.DEFAULT_HOST]
+        self.latency: dict[str, float] = {}
+        self._down_until: dict[str, float] = {}
+
+    def ranked(self) -> list[str]:
+        """Healthy hosts by latency, unmeasured ones in the configured order."""
+        now = time.monotonic()
+        return sorted(
+            self.hosts,
+            key=lambda host: (
+                now < self._down_until.get(host, 0),
+                self.latency.get(host, math.inf),
+                self.hosts.index(host),
+            ),
+        )
+
+    def url(self, host: str, path: str) -> str:
+        """`path` is relative to the API root, e.g. "v7/weather/now", "geo/v2/..."."""
+        if path.startswith("geo/") and host in self.LEGACY_HOSTS:
+            return f"https://geoapi.qweather.com/{path.removeprefix('geo/')}"
+        return f"https://{host}/{path}"
+
+    def succeeded(self, host: str, seconds: float) -> None:
+        self._down_until.pop(host, None)
+        if (latency := self.latency.get(host)) is None:
+            self.latency[host] = seconds
+        else:
+            self.latency[host] = latency + self.LATENCY_WEIGHT * (seconds - latency)
+
+    def failed(self, host: str, err: BaseException) -> None:
+        _LOGGER.debug("Host %s failed: %r", host, err)
+        self._down_until[host] = time.monotonic() + self.FAILURE_COOLDOWN
+
+    async def async_health_check(self, session: ClientSession) -> None:
+        """Measure every host, without a key so it costs no quota."""
+
+        async def check(host: str) -> None:
+            started = time.monotonic()
+            try:
+                response = await session.get(
+                    self.url(host, "v7/weather/now"), timeout=self.ATTEMPT_TIMEOUT
+                )
+                response.release()
+            except (ClientError, TimeoutError) as err:
+                self.failed(host, err)
+            else:
+                self.succeeded(host, time.monotonic() - started)
+
+        await asyncio.gather(*(check(host) for host in self.hosts))
+        _LOGGER.debug(
+            "Host latency: %s",
+            {host: round(latency, 3) for host, latency in self.latency.items()},
+        )
+
+
+class QWeatherClient:
+    # All requests are muted until then, after errors not specific to an API.
+    # Bulk requests (other locations) back off apart from the regular polling.
     _wait_until: float = 0
+    _bulk_wait_until: float = 0
+
+    # Codes meaning the key is not entitled to an endpoint, rather than a hiccup.
+    UNENTITLED_CODES = frozenset({"204", "403", "404"})
+
+    # Bulk fetches (many locations) share the quota with the regular polling.
+    BULK_QPM = 60
+    BULK_CONCURRENCY = 5
 
     def __init__(
         self,
@@ -29,76 +167,251 @@ class QWeatherClient:
         api_key: str,
         location: str,  # longitude,latitude
         gird_weather: bool,
+        hosts: list[str] | None = None,
     ) -> None:
         super().__init__()
         self.http = session
+        self.hosts = HostPool(hosts)
         self.params = {"location": location, "key": api_key}
         self.weather_type = "grid-weather" if gird_weather else "weather"
+        # Muted paths, or (path, location) for errors specific to the location.
+        self._url_wait_until: dict[str | tuple[str, str], float] = {}
+        # (api, location) -> updateTime of its last successful response
+        self._update_times: dict[tuple[str, str], str] = {}
+        self._location_id: str | None = None
+        self.bulk_limiter = RateLimiter(self.BULK_QPM, self.BULK_CONCURRENCY)
+
+    @property
+    def endpoints(self) -> dict[str, str]:
+        """Coordinator name -> API polled by it."""
+        return {
+            "observation": f"{self.weather_type}/now",
+            "daily_forecast": f"{self.weather_type}/7d",
+            "hourly_forecast": f"{self.weather_type}/24h",
+            "air_now": "air/now",
+            "minutely_precipitation": "minutely/5m",
+            "warning_now": "warning/now",
+            "area": "grid-weather/now",
+            "solar_radiation": "solar-radiation/72h",
+        }
+
+    async def probe_entitlements(
+        self,
+        previous: Collection[str] | None = None,
+        names: Collection[str] | None = None,
+    ) -> list[str]:
+        """Probe the endpoints concurrently, return the names of the entitled ones.
+
+        Inconclusive results (network errors, 429, 5xx...) and endpoints left out
+        of `names` keep the previous state.
+        """
+        probed = {
+            name: api
+            for name, api in self.endpoints.items()
+            if names is None or name in names
+        }
+        codes = await asyncio.gather(*(self.probe(api) for api in probed.values()))
+        results = dict(zip(probed, codes, strict=True))
+        _LOGGER.debug("Probe results: %s", results)
+        return [
+            name
+            for name in self.endpoints
+            if (code := results.get(name)) == "200"
+            or (
+                code not in self.UNENTITLED_CODES
+                and (previous is None or name in previous)
+            )
+        ]
+
+    async def probe(self, api: str) -> str | None:
+        """Return the response code of `api`, without touching the backoff state.
+
+        Fails over between the hosts like url_get.
+        """
+        try:
+            json_data = await self._failover_get(f"v7/{api}", self.params)
+        except (ClientError, TimeoutError, QWeatherError) as err:
+            _LOGGER.debug("Probe %s failed: %r", api, err)
+            return None
+        return json_data.get("code") if json_data else None
 
     async def city_lookup(self) -> str:
         """城市搜索-城市信息查询"""
-        geo_url = "https://geoapi.qweather.com/v2/city/lookup"
-        if json_data := await self.url_get(geo_url, self.params):
+        if json_data := await self.url_get("geo/v2/city/lookup"):
             if locations := json_data.get("location"):
                 return locations[0].get("name", "未知")
         return "未知"
 
+    async def location_id(self) -> str | None:
+        """城市搜索 - LocationID, required by the historical APIs"""
+        if self._location_id is None:
+            if json_data := await self.url_get("geo/v2/city/lookup"):
+                if locations := json_data.get("location"):
+                    self._location_id = locations[0].get("id")
+        return self._location_id
+
+    async def historical_weather(
+        self, location_id: str, day: date
+    ) -> list[HistoricalHourly]:
+        """时光机 - 历史天气 (last 10 days, not today)"""
+        json_data = await self.api_get(
+            "historical/weather",
+            {"location": location_id, "date": day.strftime("%Y%m%d")},
+            bulk=True,
+        )
+        return json_data.get("weatherHourly", [])
+
     async def update_observation(self) -> RealtimeWeather | None:
         """城市天气/格点天气 - 实时天气"""
         json_data = await self.api_get(f"{self.weather_type}/now")
-        return json_data.get("now") if json_data else None
+        return json_data.get("now")
 
     async def update_daily_forecast(self) -> list[DailyForecast]:
         """城市天气/格点天气 - 每日天气预报"""
         json_data = await self.api_get(f"{self.weather_type}/7d")
-        return json_data.get("daily", []) if json_data else []
+        return json_data.get("daily", [])
 
     async def update_hourly_forecast(self) -> list[HourlyForecast]:
         """城市天气/格点天气 - 逐小时天气预报"""
         json_data = await self.api_get(f"{self.weather_type}/24h")
-        return json_data.get("hourly") if json_data else []
+        return json_data.get("hourly", [])
 
     async def update_air_now(self) -> AirNow | None:
         """空气质量-实时空气质量"""
         json_data = await self.api_get("air/now")
-        return json_data.get("now") if json_data else None
+        return json_data.get("now")
 
     async def update_minutely_precipitation(self) -> MinutelyPrecipitation:
         """分钟预报-分钟级降水"""
         json_data = await self.api_get("minutely/5m")
-        return (
-            {
-                "summary": json_data.get("summary", ""),
-                "minutely": json_data.get("minutely", []),
-            }
-            if json_data
-            else {"summary": "", "minutely": []}
-        )
+        return {
+            "summary": json_data.get("summary", ""),
+            "minutely": json_data.get("minutely", []),
+        }
 
     async def update_warning_now(self) -> list[WeatherWarning]:
         """预警-天气灾害预警"""
         json_data = await self.api_get("warning/now")
-        return json_data.get("warning", []) if json_data else []
+        return json_data.get("warning", [])
 
     async def update_indices_1d(self) -> list[IndicesDailyItem]:
         """天气指数-天气指数预报"""
         json_data = await self.api_get("indices/1d", {"type": "0"})
-        return json_data.get("daily") if json_data else []
+        return json_data.get("daily", [])
+
+    async def update_solar_radiation(self) -> list[SolarRadiation]:
+        """太阳辐射 - 太阳辐射预报 (72h, so tomorrow is complete)"""
+        json_data = await self.api_get("solar-radiation/72h")
+        return json_data.get("radiation", [])
+
+    def update_time(self, api: str, location: str | None = None) -> datetime | None:
+        """`updateTime` of the last successful response of `api` for `location`.
+
+        The configured location by default.
+        """
+        location = location or self.params["location"]
+        if update_time := self._update_times.get((api, location)):
+            return datetime.fromisoformat(update_time)
+        return None
 
     async def api_get(
-        self, api: str, extra_params: Mapping[str, str] | None = None
-    ) -> dict | None:
-        return await self.url_get(f"{self.dev_api_v7}/{api}", extra_params)
+        self,
+        api: str,
+        extra_params: Mapping[str, str] | None = None,
+        *,
+        bulk: bool = False,
+    ) -> dict:
+        """Raise QWeatherError when there is no usable response."""
+        json_data = await self.url_get(f"v7/{api}", extra_params, bulk=bulk)
+        if json_data is None:
+            raise QWeatherError(f"No data from {api}")
+        if update_time := json_data.get("updateTime"):
+            location = (extra_params or {}).get("location", self.params["location"])
+            self._update_times[api, location] = update_time
+        return json_data
+
+    @staticmethod
+    def _decode(url: str, body: bytes) -> Any:
+        """Raise QWeatherError on bodies that are not JSON, e.g. HTML error pages.
+
+        Decoded on the event loop: json_loads holds the GIL for the whole call,
+        so the executor would not free the loop for it.
+        """
+        if not body.strip():
+            return None
+        started = time.perf_counter()
+        try:
+            json_data = json_loads(body)
+        except ValueError as err:
+            raise QWeatherError(f"Invalid JSON from {url}: {err}") from err
+        _LOGGER.debug(
+            "Decoded %d bytes from %s, blocked the event loop for %.2f ms",
+            len(body),
+            url,
+            (time.perf_counter() - started) * 1000,
+        )
+        return json_data
+
+    def _back_off(self, bulk: bool, until: float) -> None:
+        if bulk:
+            self._bulk_wait_until = until
+        else:
+            self._wait_until = until
+
+    async def _failover_get(self, url: str, params: Mapping[str, str]) -> Any:
+        """Request `url` from the hosts in turn, return the decoded body.
+
+        Network errors, invalid JSON and code 500 fail over to the next host, the
+        errors of the last one are raised.
+        """
+        hosts = self.hosts.ranked()
+        for host in hosts:
+            last = host == hosts[-1]
+            started = time.monotonic()
+            try:
+                response = await self.http.get(
+                    self.hosts.url(host, url),
+                    params=params,
+                    **({} if last else {"timeout": self.hosts.ATTEMPT_TIMEOUT}),
+                )
+                json_data = self._decode(url, await response.read())
+            except (ClientError, TimeoutError, QWeatherError) as err:
+                self.hosts.failed(host, err)
+                if last:
+                    raise
+                continue
+            if not last and json_data and json_data.get("code") == "500":
+                self.hosts.failed(host, QWeatherError("500"))
+                continue
+            self.hosts.succeeded(host, time.monotonic() - started)
+            return json_data
+        return None
 
     async def url_get(
-        self, url: str, extra_params: Mapping[str, str] | None = None
+        self,
+        url: str,
+        extra_params: Mapping[str, str] | None = None,
+        *,
+        bulk: bool = False,
     ) -> dict | None:
-        if datetime.now().timestamp() < self._wait_until:
-            return None
+        """`url` is a path relative to the API root, requested from the fastest host.
 
+        Network errors, and code 500, fail over to the next host. Errors of `bulk`
+        requests only back off the bulk requests, the regular polling finds out
+        about account-wide ones (e.g. 402) by itself; its backoffs apply to both.
+        """
         params = {**self.params, **extra_params} if extra_params else self.params
-        response = await self.http.get(url, params=params)
-        json_data = await response.json()
+        url_location = (url, params["location"])
+        now = datetime.now().timestamp()
+        if (
+            now < self._wait_until
+            or (bulk and now < self._bulk_wait_until)
+            or now < self._url_wait_until.get(url, 0)
+            or now < self._url_wait_until.get(url_location, 0)
+        ):
+            return None
+
+        json_data = await self._failover_get(url, params)
         if not json_data:
             _LOGGER.warning("Empty response from: %s", url)
             return None
@@ -107,20 +420,23 @@ class QWeatherClient:
             case "200":
                 return json_data
             case "204":
-                _LOGGER.error("204 请求成功，但你查询的地区暂时没有你需要的数据。")
-                self._wait_until = math.inf
+                _LOGGER.error(
+                    "204 请求成功，但你查询的地区暂时没有你需要的数据。(%s)",
+                    url_location,
+                )
+                self._url_wait_until[url_location] = math.inf
                 return None
             case "400":
                 _LOGGER.error(
                     "400 请求错误，可能包含错误的请求参数或缺少必选的请求参数。"
                 )
-                self._wait_until = math.inf
+                self._back_off(bulk, math.inf)
                 return None
             case "401":
                 _LOGGER.error(
                     "401 认证失败，可能使用了错误的KEY、数字签名错误、KEY的类型错误（如使用SDK的KEY去访问Web API）。"
                 )
-                self._wait_until = math.inf
+                self._back_off(bulk, math.inf)
                 return None
             case "402":
                 _LOGGER.warning(
@@ -129,27 +445,28 @@ class QWeatherClient:
                 tomorrow_zero = datetime.now().replace(
                     hour=0, minute=0, second=0, microsecond=0
                 ) + timedelta(days=1)
-                self._wait_until = tomorrow_zero.timestamp()
+                self._back_off(bulk, tomorrow_zero.timestamp())
                 return None
             case "403":
                 _LOGGER.error(
-                    "403 无访问权限，可能是绑定的PackageName、BundleID、域名IP地址不一致，或者是需要额外付费的数据。"
+                    "403 无访问权限，可能是绑定的PackageName、BundleID、域名IP地址不一致，或者是需要额外付费的数据。(%s)",
+                    url,
                 )
-                self._wait_until = math.inf
+                self._url_wait_until[url] = math.inf
                 return None
             case "404":
-                _LOGGER.error("404 查询的数据或地区不存在。")
-                self._wait_until = math.inf
+                _LOGGER.error("404 查询的数据或地区不存在。(%s)", url_location)
+                self._url_wait_until[url_location] = math.inf
                 return None
             case "429":
                 _LOGGER.warning("429 超过限定的QPM（每分钟访问次数）")
-                self._wait_until = datetime.now().timestamp() + 60
+                self._back_off(bulk, datetime.now().timestamp() + 60)
                 return None
             case "500":
                 _LOGGER.warning("500 无响应或超时，接口服务异常")
-                self._wait_until = datetime.now().timestamp() + 60
+                self._back_off(bulk, datetime.now().timestamp() + 60)
                 return None
             case _:
                 _LOGGER.warning("%s 未知错误 (%s)", code, url)
-                self._wait_until = datetime.now().timestamp() + 600
+                self._back_off(bulk, datetime.now().timestamp() + 600)
                 return None
@@ -0,0 +1,214 @@
+"""Weather along a route or over an area, sampled on the grid-weather grid."""
+
+import asyncio
+from collections.abc import Iterable
+import logging
+import math
+import time
+from typing import Any
+
+from aiohttp import ClientError
+
+from .api import QWeatherClient, QWeatherError
+from .const import AreaWeather, RealtimeWeather, WeatherWarning
+
+_LOGGER = logging.getLogger(__name__)
+
+# Degrees, about the resolution of grid-weather. Samples in one cell are fetched once.
+CELL_SIZE = 0.05
+# Warnings are issued per county, so a much coarser grid is enough for them.
+WARNING_CELL_SIZE = 0.25
+MAX_CELLS = 50
+# Requests per day the sampler may spend, cells are refetched less often beyond it.
+DAILY_BUDGET = 1000
+
+type Point = tuple[float, float]  # longitude, latitude
+
+
+def parse_points(text: str) -> list[Point]:
+    """Parse "lon,lat;lon,lat;..." (also one point per line)."""
+    points = []
+    for item in text.replace("\n", ";").split(";"):
+        if item := item.strip():
+            longitude, latitude = (float(value) for value in item.split(","))
+            points.append((longitude, latitude))
+    return points
+
+
+def sample_route(points: list[Point]) -> list[Point]:
+    """Points along the polyline, at most half a cell apart."""
+    samples = points[:1]
+    for (lon0, lat0), (lon1, lat1) in zip(points, points[1:], strict=False):
+        steps = max(1, math.ceil(math.hypot(lon1 - lon0, lat1 - lat0) / CELL_SIZE * 2))
+        samples.extend(
+            (lon0 + (lon1 - lon0) * i / steps, lat0 + (lat1 - lat0) * i / steps)
+            for i in range(1, steps + 1)
+        )
+    return samples
+
+
+def sample_polygon(points: list[Point]) -> list[Point]:
+    """Cell centers inside the polygon, plus its vertices."""
+    longitudes = [lon for lon, _ in points]
+    latitudes = [lat for _, lat in points]
+    samples = list(points)
+    lon = math.floor(min(longitudes) / CELL_SIZE) * CELL_SIZE
+    while lon <= max(longitudes):
+        lat = math.floor(min(latitudes) / CELL_SIZE) * CELL_SIZE
+        while lat <= max(latitudes):
+            if _inside((lon, lat), points):
+                samples.append((lon, lat))
+            lat += CELL_SIZE
+        lon += CELL_SIZE
+    return samples
+
+
+def to_cells(samples: Iterable[Point], size: float = CELL_SIZE) -> list[str]:
+    """Distinct grid cells of the samples, as "lon,lat" API locations."""
+    cells = dict.fromkeys(
+        f"{round(lon / size) * size:.2f},{round(lat / size) * size:.2f}"
+        for lon, lat in samples
+    )
+    return list(cells)
+
+
+def _inside(point: Point, polygon: list[Point]) -> bool:
+    x, y = point
+    inside = False
+    for (x0, y0), (x1, y1) in zip(polygon, polygon[1:] + polygon[:1], strict=True):
+        if (y0 > y) != (y1 > y) and x < (x1 - x0) * (y - y0) / (y1 - y0) + x0:
+            inside = not inside
+    return inside
+
+
+class AreaSampler:
+    """Fetches every cell concurrently within the bulk rate limit, and aggregates.
+
+    Results are cached per cell: reused within `ttl`, and used as a fallback
+    for up to `max_age` when fetching a cell fails. The batch is aggregated in
+    the executor, off the event loop.
+    """
+
+    def __init__(
+        self,
+        client: QWeatherClient,
+        samples: list[Point],
+        ttl: float,
+        max_age: float,
+    ) -> None:
+        self.client = client
+        # Larger areas are sampled evenly on a coarser grid, of at most MAX_CELLS
+        self.cell_size = CELL_SIZE
+        self.cells = to_cells(samples)
+        while len(self.cells) > MAX_CELLS:
+            self.cell_size += CELL_SIZE
+            self.cells = to_cells(samples, self.cell_size)
+        if self.cell_size > CELL_SIZE:
+            _LOGGER.warning(
+                "Area covers over %d grid cells, sampled every %.2f° instead",
+                MAX_CELLS,
+                self.cell_size,
+            )
+        self.warning_cells = to_cells(
+            (tuple(map(float, cell.split(","))) for cell in self.cells),
+            WARNING_CELL_SIZE,
+        )
+        # One round fetches every cell and warning cell
+        self.ttl = max(
+            ttl, (len(self.cells) + len(self.warning_cells)) * 86400 / DAILY_BUDGET
+        )
+        if self.ttl > ttl:
+            _LOGGER.debug(
+                "Cells refetched every %.0f min to stay within %d requests a day",
+                self.ttl / 60,
+                DAILY_BUDGET,
+            )
+        self.max_age = max_age
+        self._cache: dict[str, tuple[float, Any]] = {}
+
+    async def update(self) -> AreaWeather:
+        now = time.monotonic()
+        observations: list[RealtimeWeather | None] = await asyncio.gather(
+            *(self._get(now, "grid-weather/now", "now", cell) for cell in self.cells)
+        )
+        warning_lists: list[list[WeatherWarning] | None] = await asyncio.gather(
+            *(
+                self._get(now, "warning/now", "warning", cell)
+                for cell in self.warning_cells
+            )
+        )
+        started = time.perf_counter()
+        area_weather = await asyncio.get_running_loop().run_in_executor(
+            None, self._aggregate, observations, warning_lists
+        )
+        _LOGGER.debug(
+            "Aggregated %d cells in the executor in %.2f ms",
+            area_weather["sampled"],
+            (time.perf_counter() - started) * 1000,
+        )
+        return area_weather
+
+    def _aggregate(
+        self,
+        observations: list[RealtimeWeather | None],
+        warning_lists: list[list[WeatherWarning] | None],
+    ) -> AreaWeather:
+        sampled = [
+            (cell, observation)
+            for cell, observation in zip(self.cells, observations, strict=True)
+            if observation
+        ]
+        if not sampled:
+            raise QWeatherError("No grid cell of the area could be fetched")
+
+        def extreme(key: str, pick=max) -> tuple[float | None, str | None]:
+            values = [
+                (float(value), cell)
+                for cell, observation in sampled
+                if (value := observation.get(key)) is not None
+            ]
+            return pick(values) if values else (None, None)
+
+        max_precipitation, wettest = extreme("precip")
+        min_temperature, coldest = extreme("temp", min)
+        max_wind_speed, windiest = extreme("windSpeed")
+        warnings = {
+            warning["id"]: {
+                "id": warning["id"],
+                "type": warning.get("typeName"),
+                "severity": warning.get("severityColor"),
+            }
+            for warning_list in warning_lists
+            for warning in warning_list or []
+        }
+        return {
+            "cells": len(self.cells),
+            "cell_size": round(self.cell_size, 2),
+            "sampled": len(sampled),
+            "max_precipitation": max_precipitation,
+            "max_precipitation_cell": wettest,
+            "min_temperature": min_temperature,
+            "min_temperature_cell": coldest,
+            "max_wind_speed": max_wind_speed,
+            "max_wind_speed_cell": windiest,
+            "warnings": list(warnings.values()),
+        }
+
+    async def _get(self, now: float, api: str, field: str, cell: str) -> Any:
+        key = f"{api}@{cell}"
+        cached = self._cache.get(key)
+        if cached and now - cached[0] < self.ttl:
+            return cached[1]
+        try:
+            async with self.client.bulk_limiter:
+                json_data = await self.client.api_get(
+                    api, {"location": cell}, bulk=True
+                )
+        except (QWeatherError, ClientError, TimeoutError) as err:
+            if cached and now - cached[0] < self.max_age:
+                return cached[1]
+            _LOGGER.debug("Failed to fetch %s: %r", key, err)
+            return None
+        value = json_data.get(field)
+        self._cache[key] = (now, value)
+        return value
@@ -0,0 +1,255 @@
+"""Local sun and moon ephemeris, rise/set times are good to about a minute.
+
+Sun: NOAA solar calculator. Moon: low-precision series of the Astronomical Almanac.
+"""
+
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import logging
+import math
+from typing import NamedTuple
+
+import homeassistant.util.dt as dt_util
+
+from .const import AstronomyData, DailyForecast
+
+_LOGGER = logging.getLogger(__name__)
+
+SUN_HORIZON = -0.833  # refraction + semi-diameter
+SEARCH_STEP = timedelta(minutes=20)
+
+# Allowed difference between the API and local values before it is logged.
+SUN_TOLERANCE = timedelta(minutes=3)
+MOON_TOLERANCE = timedelta(minutes=10)
+
+MOON_PHASES = [
+    "new_moon",
+    "waxing_crescent",
+    "first_quarter",
+    "waxing_gibbous",
+    "full_moon",
+    "waning_gibbous",
+    "last_quarter",
+    "waning_crescent",
+]
+
+
+class DailyEvents(NamedTuple):
+    sunrise: datetime | None
+    sunset: datetime | None
+    moonrise: datetime | None
+    moonset: datetime | None
+
+
+class Astronomy:
+    """Sun and moon for the configured location, without any API request."""
+
+    def __init__(self, latitude: float, longitude: float) -> None:
+        self.latitude = latitude
+        self.longitude = longitude
+
+    async def update(self) -> AstronomyData:
+        """Compute the current sun and moon state, for the astronomy coordinator."""
+        now = dt_util.now()
+        elevation, azimuth = sun_position(now, self.latitude, self.longitude)
+        events = self.events(now.date())
+        phase, illumination = moon_phase(now)
+        return {
+            "elevation": round(elevation, 2),
+            "azimuth": round(azimuth, 2),
+            "is_daytime": elevation > SUN_HORIZON,
+            "sunrise": events.sunrise,
+            "sunset": events.sunset,
+            "moonrise": events.moonrise,
+            "moonset": events.moonset,
+            "moon_phase": phase,
+            "moon_illumination": round(illumination * 100, 1),
+        }
+
+    def events(self, day: date) -> DailyEvents:
+        """Rise and set times of the local day, computed once per day."""
+        return daily_events(
+            dt_util.start_of_local_day(day), self.latitude, self.longitude
+        )
+
+    def is_daytime(self, moment: datetime) -> bool:
+        return sun_position(moment, self.latitude, self.longitude)[0] > SUN_HORIZON
+
+    def cross_check(self, weather_daily: list[DailyForecast] | None) -> None:
+        """Compare the local rise/set times with those of the daily forecast."""
+        for daily in weather_daily or []:
+            day = date.fromisoformat(daily["fxDate"])
+            events = self.events(day)
+            for key, tolerance in (
+                ("sunrise", SUN_TOLERANCE),
+                ("sunset", SUN_TOLERANCE),
+                ("moonrise", MOON_TOLERANCE),
+                ("moonset", MOON_TOLERANCE),
+            ):
+                local: datetime | None = getattr(events, key)
+                if not (api := daily.get(key)) or local is None:
+                    continue
+                hour, minute = map(int, api.split(":"))
+                expected = local.replace(hour=hour, minute=minute, second=0)
+                if abs(local - expected) > tolerance:
+                    _LOGGER.debug(
+                        "%s %s: API %s, local %s", day, key, api, local.time()
+                    )
+
+
+@lru_cache(maxsize=16)
+def daily_events(start: datetime, latitude: float, longitude: float) -> DailyEvents:
+    end = start + timedelta(days=1)
+    sunrise, sunset = _crossings(
+        lambda moment: sun_position(moment, latitude, longitude)[0] - SUN_HORIZON,
+        start,
+        end,
+    )
+    moonrise, moonset = _crossings(
+        lambda moment: _moon_altitude(moment, latitude, longitude), start, end
+    )
+    return DailyEvents(sunrise, sunset, moonrise, moonset)
+
+
+def sun_position(
+    moment: datetime, latitude: float, longitude: float
+) -> tuple[float, float]:
+    """Elevation and azimuth (from north) of the sun, in degrees."""
+    jd = _julian_day(moment)
+    _, ra, dec = _sun_equatorial(jd)
+    return _horizontal(ra, dec, jd, latitude, longitude)
+
+
+def moon_phase(moment: datetime) -> tuple[str, float]:
+    """Phase name and illuminated fraction of the moon."""
+    jd = _julian_day(moment)
+    sun_longitude = _sun_equatorial(jd)[0]
+    moon_longitude = _moon_equatorial(jd)[0]
+    elongation = (moon_longitude - sun_longitude) % 360
+    index = int((elongation + 22.5) // 45) % len(MOON_PHASES)
+    return MOON_PHASES[index], (1 - math.cos(math.radians(elongation))) / 2
+
+
+def _crossings(
+    altitude: Callable[[datetime], float], start: datetime, end: datetime
+) -> tuple[datetime | None, datetime | None]:
+    """First upward and downward zero crossings of `altitude` in [start, end)."""
+    rise = set_ = None
+    t0, a0 = start, altitude(start)
+    while t0 < end:
+        t1 = min(t0 + SEARCH_STEP, end)
+        a1 = altitude(t1)
+        if (a0 < 0) != (a1 < 0):
+            lo, hi, a_lo = t0, t1, a0
+            while hi - lo > timedelta(seconds=1):
+                mid = lo + (hi - lo) / 2
+                if ((a_mid := altitude(mid)) < 0) == (a_lo < 0):
+                    lo, a_lo = mid, a_mid
+                else:
+                    hi = mid
+            crossing = hi.replace(microsecond=0)
+            if a0 < 0:
+                rise = rise or crossing
+            else:
+                set_ = set_ or crossing
+        t0, a0 = t1, a1
+    return rise, set_
+
+
+def _julian_day(moment: datetime) -> float:
+    return moment.timestamp() / 86400 + 2440587.5
+
+
+def _sun_equatorial(jd: float) -> tuple[float, float, float]:
+    """Apparent ecliptic longitude, right ascension and declination of the sun."""
+    t = (jd - 2451545) / 36525
+    mean_longitude = 280.46646 + t * (36000.76983 + t * 0.0003032)
+    anomaly = math.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    center = (
+        math.sin(anomaly) * (1.914602 - t * (0.004817 + 0.000014 * t))
+        + math.sin(2 * anomaly) * (0.019993 - 0.000101 * t)
+        + math.sin(3 * anomaly) * 0.000289
+    )
+    omega = math.radians(125.04 - 1934.136 * t)
+    longitude = (mean_longitude + center - 0.00569 - 0.00478 * math.sin(omega)) % 360
+    obliquity = _obliquity(t) + 0.00256 * math.cos(omega)
+    return longitude, *_equatorial(longitude, 0, obliquity)
+
+
+def _moon_equatorial(jd: float) -> tuple[float, float, float, float]:
+    """Ecliptic longitude, right ascension, declination and parallax of the moon."""
+    t = (jd - 2451545) / 36525
+
+    def sin(degrees: float) -> float:
+        return math.sin(math.radians(degrees))
+
+    def cos(degrees: float) -> float:
+        return math.cos(math.radians(degrees))
+
+    longitude = (
+        218.32
+        + 481267.881 * t
+        + 6.29 * sin(135.0 + 477198.87 * t)
+        - 1.27 * sin(259.3 - 413335.36 * t)
+        + 0.66 * sin(235.7 + 890534.22 * t)
+        + 0.21 * sin(269.9 + 954397.74 * t)
+        - 0.19 * sin(357.5 + 35999.05 * t)
+        - 0.11 * sin(186.5 + 966404.03 * t)
+    ) % 360
+    latitude = (
+        5.13 * sin(93.3 + 483202.02 * t)
+        + 0.28 * sin(228.2 + 960400.89 * t)
+        - 0.28 * sin(318.3 + 6003.15 * t)
+        - 0.17 * sin(217.6 - 407332.21 * t)
+    )
+    parallax = (
+        0.9508
+        + 0.0518 * cos(135.0 + 477198.87 * t)
+        + 0.0095 * cos(259.3 - 413335.36 * t)
+        + 0.0078 * cos(235.7 + 890534.22 * t)
+        + 0.0028 * cos(269.9 + 954397.74 * t)
+    )
+    return longitude, *_equatorial(longitude, latitude, _obliquity(t)), parallax
+
+
+def _moon_altitude(moment: datetime, latitude: float, longitude: float) -> float:
+    """Geocentric altitude above the apparent rise/set altitude of the moon."""
+    jd = _julian_day(moment)
+    _, ra, dec, parallax = _moon_equatorial(jd)
+    altitude = _horizontal(ra, dec, jd, latitude, longitude)[0]
+    return altitude - (0.7275 * parallax - 0.5667)
+
+
+def _obliquity(t: float) -> float:
+    return 23.439291 - 0.0130042 * t
+
+
+def _equatorial(
+    longitude: float, latitude: float, obliquity: float
+) -> tuple[float, float]:
+    lon, lat, eps = map(math.radians, (longitude, latitude, obliquity))
+    ra = math.atan2(
+        math.sin(lon) * math.cos(eps) - math.tan(lat) * math.sin(eps), math.cos(lon)
+    )
+    dec = math.asin(
+        math.sin(lat) * math.cos(eps) + math.cos(lat) * math.sin(eps) * math.sin(lon)
+    )
+    return math.degrees(ra) % 360, math.degrees(dec)
+
+
+def _horizontal(
+    ra: float, dec: float, jd: float, latitude: float, longitude: float
+) -> tuple[float, float]:
+    sidereal_time = 280.46061837 + 360.98564736629 * (jd - 2451545)
+    hour_angle = math.radians(sidereal_time + longitude - ra)
+    lat, dec = math.radians(latitude), math.radians(dec)
+    altitude = math.asin(
+        math.sin(lat) * math.sin(dec)
+        + math.cos(lat) * math.cos(dec) * math.cos(hour_angle)
+    )
+    azimuth = math.atan2(
+        math.sin(hour_angle),
+        math.cos(hour_angle) * math.sin(lat) - math.tan(dec) * math.cos(lat),
+    )
+    return math.degrees(altitude), (math.degrees(azimuth) + 180) % 360
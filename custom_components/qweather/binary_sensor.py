@@ -1,4 +1,4 @@
-from collections.abc import Callable, MutableMapping
+from collections.abc import Callable, Mapping, MutableMapping
 import logging
 from typing import Any, Generic, TypeVar
 
@@ -17,7 +17,8 @@ from homeassistant.helpers.update_coordinator import (
 )
 
 from . import Coordinators, QWeatherConfigEntry
-from .const import DOMAIN, WeatherWarning
+from .const import DOMAIN, AreaWeather, WeatherWarning
+from .coordinator import QWeatherCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,11 +29,14 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ):
     coordinators: Coordinators = config_entry.runtime_data
-    async_add_entities(
-        [
-            QWeatherWarningBinarySensor(coordinators.warning_now, config_entry),
-        ]
-    )
+    entities: list[QBinarySensor] = []
+    if coordinators.warning_now:
+        entities.append(
+            QWeatherWarningBinarySensor(coordinators.warning_now, config_entry)
+        )
+    if coordinators.area:
+        entities.append(QAreaWarningBinarySensor(coordinators.area, config_entry))
+    async_add_entities(entities)
 
 
 _DataT = TypeVar("_DataT")
@@ -60,6 +64,15 @@ class QBinarySensor(CoordinatorEntity, BinarySensorEntity, Generic[_DataT]):
         )
         self._async_update_attrs(self.coordinator.data)
 
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        attributes = getattr(self, "_attr_extra_state_attributes", None)
+        if isinstance(self.coordinator, QWeatherCoordinator) and (
+            stale_attributes := self.coordinator.stale_attributes
+        ):
+            return {**(attributes or {}), **stale_attributes}
+        return attributes
+
     @callback
     def _handle_coordinator_update(self) -> None:
         self._async_update_attrs(self.coordinator.data)
@@ -91,14 +104,45 @@ class QWeatherWarningBinarySensor(QBinarySensor):
         )
 
     @callback
-    def _async_update_attrs(self, data: list[WeatherWarning]):
+    def _async_update_attrs(self, data: list[WeatherWarning] | None):
         super()._async_update_attrs(data)
+        # Full title and text: qweather.get_warnings service / websocket command
         self._attr_extra_state_attributes = {
             "warning": [
                 {
-                    "title": warning.get("title"),
-                    "text": warning.get("text"),
+                    "id": warning.get("id"),
+                    "type": warning.get("typeName"),
+                    "severity": warning.get("severityColor"),
+                    "start": warning.get("startTime"),
+                    "end": warning.get("endTime"),
                 }
-                for warning in data
+                for warning in data or []
             ],
         }
+
+
+class QAreaWarningBinarySensor(QBinarySensor):
+    """Any warning active in the configured route or area."""
+
+    def __init__(
+        self,
+        coordinator: DataUpdateCoordinator[AreaWeather],
+        config_entry: QWeatherConfigEntry,
+    ):
+        super().__init__(
+            coordinator,
+            BinarySensorEntityDescription(
+                key="area_weather_warning",
+                device_class=BinarySensorDeviceClass.SAFETY,
+                translation_key="area_weather_warning",
+            ),
+            config_entry,
+            lambda data: bool(data["warnings"]) if data else None,
+        )
+
+    @callback
+    def _async_update_attrs(self, data: AreaWeather | None):
+        super()._async_update_attrs(data)
+        self._attr_extra_state_attributes = {
+            "warning": data["warnings"] if data else [],
+        }
@@ -1,4 +1,3 @@
-from http import HTTPStatus
 import logging
 from typing import Any
 
@@ -15,7 +14,26 @@ from homeassistant.core import callback
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 import homeassistant.helpers.config_validation as cv
 
-from .const import CONF_GIRD, DOMAIN
+from .api import HostPool, QWeatherClient, parse_hosts
+from .area import parse_points
+from .const import (
+    AREA_TYPES,
+    CONF_API_HOSTS,
+    CONF_AREA,
+    CONF_AREA_TYPE,
+    CONF_ENTITLEMENTS,
+    CONF_FEEDS,
+    CONF_GIRD,
+    CONF_MAX_STALE,
+    CONF_PV_PEAK_POWER,
+    CONF_PV_PERFORMANCE_RATIO,
+    DEFAULT_FEEDS,
+    DEFAULT_MAX_STALE,
+    DEFAULT_PV_PEAK_POWER,
+    DEFAULT_PV_PERFORMANCE_RATIO,
+    DOMAIN,
+    FEEDS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,32 +51,32 @@ class QWeatherFlowHandler(ConfigFlow, domain=DOMAIN):
             await self.async_set_unique_id(f"{longitude}_{latitude}".replace(".", "_"))
             self._abort_if_unique_id_configured()
 
-            grid_weather = "grid-weather" if use_grid else "weather"
-            url = f"https://devapi.qweather.com/v7/{grid_weather}/now"
-            params = {
-                "location": f"{longitude},{latitude}",
-                "key": user_input[CONF_API_KEY],
-            }
-            session = async_get_clientsession(self.hass)
-            resp = await session.get(url, params=params)
-            if resp.status == HTTPStatus.OK:
-                data = await resp.json()
-                _LOGGER.debug(data)
-                if data["code"] == "200":
-                    return self.async_create_entry(
-                        title=user_input[CONF_NAME],
-                        data={
-                            CONF_NAME: user_input[CONF_NAME],
-                            CONF_API_KEY: user_input[CONF_API_KEY],
-                            CONF_LONGITUDE: user_input[CONF_LONGITUDE],
-                            CONF_LATITUDE: user_input[CONF_LATITUDE],
-                        },
-                        options={
-                            CONF_GIRD: use_grid,
-                        },
-                    )
-
-            _LOGGER.warning("Failed to communicate with QWeather: %s", resp.status)
+            api_hosts = user_input.get(CONF_API_HOSTS, HostPool.DEFAULT_HOST)
+            client = QWeatherClient(
+                async_get_clientsession(self.hass),
+                user_input[CONF_API_KEY],
+                f"{longitude},{latitude}",
+                use_grid,
+                parse_hosts(api_hosts),
+            )
+            entitlements = await client.probe_entitlements(previous=())
+            if "observation" in entitlements:
+                return self.async_create_entry(
+                    title=user_input[CONF_NAME],
+                    data={
+                        CONF_NAME: user_input[CONF_NAME],
+                        CONF_API_KEY: user_input[CONF_API_KEY],
+                        CONF_LONGITUDE: user_input[CONF_LONGITUDE],
+                        CONF_LATITUDE: user_input[CONF_LATITUDE],
+                    },
+                    options={
+                        CONF_GIRD: use_grid,
+                        CONF_API_HOSTS: api_hosts,
+                        CONF_ENTITLEMENTS: entitlements,
+                    },
+                )
+
+            _LOGGER.warning("Failed to communicate with QWeather")
             errors["base"] = "communication"
 
         my = self.hass.config
@@ -71,6 +89,7 @@ class QWeatherFlowHandler(ConfigFlow, domain=DOMAIN):
                     vol.Required(CONF_LATITUDE, default=my.latitude): cv.latitude,
                     vol.Required(CONF_NAME, default=my.location_name): str,
                     vol.Optional(CONF_GIRD, default=True): bool,
+                    vol.Optional(CONF_API_HOSTS, default=HostPool.DEFAULT_HOST): str,
                 }
             ),
             errors=errors,
@@ -88,18 +107,81 @@ class QWeatherOptionsFlow(OptionsFlow):
 
     def __init__(self, config_entry: ConfigEntry):
         """Initialize Qweather options flow."""
+        self.entry = config_entry
         self.use_grid = config_entry.options.get(CONF_GIRD, False)
+        self.api_hosts = config_entry.options.get(CONF_API_HOSTS, HostPool.DEFAULT_HOST)
+        self.feeds = list(config_entry.options.get(CONF_FEEDS, DEFAULT_FEEDS))
+        self.max_stale = {
+            name: config_entry.options.get(f"{CONF_MAX_STALE}_{name}", minutes)
+            for name, minutes in DEFAULT_MAX_STALE.items()
+        }
+        self.area = config_entry.options.get(CONF_AREA, "")
+        self.area_type = config_entry.options.get(CONF_AREA_TYPE, AREA_TYPES[0])
+        self.pv_peak_power = config_entry.options.get(
+            CONF_PV_PEAK_POWER, DEFAULT_PV_PEAK_POWER
+        )
+        self.pv_performance_ratio = config_entry.options.get(
+            CONF_PV_PERFORMANCE_RATIO, DEFAULT_PV_PERFORMANCE_RATIO
+        )
 
     async def async_step_init(self, user_input=None) -> ConfigFlowResult:
         """Handle a flow initialized by the user."""
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(data=user_input)
+            try:
+                points = parse_points(user_input.get(CONF_AREA, ""))
+            except ValueError:
+                points = None
+            # A route needs 2 points, a polygon 3; no points turns the feature off.
+            minimum = 2 if user_input[CONF_AREA_TYPE] == "route" else 3
+            if points is None or 0 < len(points) < minimum:
+                errors[CONF_AREA] = "invalid_area"
+                self.area = user_input.get(CONF_AREA, "")
+
+        if user_input is not None and not errors:
+            data = self.entry.data
+            longitude = round(data[CONF_LONGITUDE], 2)
+            latitude = round(data[CONF_LATITUDE], 2)
+            client = QWeatherClient(
+                async_get_clientsession(self.hass),
+                data[CONF_API_KEY],
+                f"{longitude},{latitude}",
+                user_input[CONF_GIRD],
+                parse_hosts(user_input[CONF_API_HOSTS]),
+            )
+            entitlements = await client.probe_entitlements(
+                self.entry.options.get(CONF_ENTITLEMENTS), user_input[CONF_FEEDS]
+            )
+            return self.async_create_entry(
+                data={**user_input, CONF_ENTITLEMENTS: entitlements}
+            )
 
         return self.async_show_form(
             step_id="init",
             data_schema=vol.Schema(
                 {
                     vol.Optional(CONF_GIRD, default=self.use_grid): bool,
+                    vol.Optional(CONF_API_HOSTS, default=self.api_hosts): str,
+                    vol.Optional(CONF_FEEDS, default=self.feeds): cv.multi_select(
+                        FEEDS
+                    ),
+                    **{
+                        vol.Optional(
+                            f"{CONF_MAX_STALE}_{name}", default=minutes
+                        ): cv.positive_int
+                        for name, minutes in self.max_stale.items()
+                    },
+                    vol.Optional(CONF_AREA, default=self.area): str,
+                    vol.Optional(CONF_AREA_TYPE, default=self.area_type): vol.In(
+                        AREA_TYPES
+                    ),
+                    vol.Optional(
+                        CONF_PV_PEAK_POWER, default=self.pv_peak_power
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_PV_PERFORMANCE_RATIO, default=self.pv_performance_ratio
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
                 }
             ),
+            errors=errors,
         )
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Literal, TypedDict
 
 DOMAIN = "qweather"
@@ -6,6 +7,58 @@ ATTRIBUTION = "Data provided by Qweather"
 MANUFACTURER = "Qweather, Inc."
 
 CONF_GIRD = "grid_weather"
+CONF_API_HOSTS = "api_hosts"  # "host1, host2", fastest healthy one is used
+CONF_ENTITLEMENTS = "entitlements"
+CONF_FEEDS = "feeds"
+CONF_MAX_STALE = "max_stale"  # option key prefix, e.g. "max_stale_observation"
+CONF_AREA = "area"  # "lon,lat;lon,lat;..."
+CONF_AREA_TYPE = "area_type"
+CONF_PV_PEAK_POWER = "pv_peak_power"  # kWp
+CONF_PV_PERFORMANCE_RATIO = "pv_performance_ratio"
+
+DEFAULT_PV_PEAK_POWER = 1.0
+DEFAULT_PV_PERFORMANCE_RATIO = 0.8
+
+AREA_TYPES = ["route", "polygon"]
+
+# Coordinator name -> display name, each can be turned off in the options.
+FEEDS = {
+    "observation": "实时天气",
+    "daily_forecast": "每日天气预报",
+    "hourly_forecast": "逐小时天气预报",
+    "air_now": "实时空气质量",
+    "minutely_precipitation": "分钟级降水",
+    "warning_now": "天气灾害预警",
+    "astronomy": "天文（本地计算）",
+    "area": "沿途/区域天气",
+    "solar_radiation": "太阳辐射预报",
+}
+# Paid-only feeds, polled only once selected in the options.
+OPT_IN_FEEDS = frozenset({"solar_radiation"})
+DEFAULT_FEEDS = [name for name in FEEDS if name not in OPT_IN_FEEDS]
+
+# Minutes the last good data is served for when updates fail, 0 disables it.
+DEFAULT_MAX_STALE = {
+    "observation": 60,
+    "daily_forecast": 12 * 60,
+    "hourly_forecast": 3 * 60,
+    "air_now": 2 * 60,
+    "minutely_precipitation": 20,
+    "warning_now": 60,
+    "area": 60,
+    "solar_radiation": 12 * 60,
+}
+
+# Minutes between the issues of the feeds published on a fixed cadence, the
+# coordinators learn their phase within it. The daily forecast is issued a few
+# times a day at irregular hours, warnings whenever one is issued or lifted;
+# those, and the feeds sampled from many locations, are polled plainly.
+PUBLISH_PERIODS = {
+    "observation": 10,
+    "hourly_forecast": 60,
+    "air_now": 60,
+    "minutely_precipitation": 5,
+}
 
 
 class RealtimeWeather(TypedDict):
@@ -128,6 +181,83 @@ class WeatherWarning(TypedDict):
     related: str | None  # ""
 
 
+class SolarRadiation(TypedDict):
+    """https://dev.qweather.com/docs/api/solar-radiation/solar-radiation-hourly-forecast/"""
+
+    fxTime: str  # "2021-05-16T09:00+08:00",
+    net: str | None  # "34.21",
+    diffuse: str | None  # "27.62",
+    direct: str | None  # "18.94"
+
+
+class SolarForecast(TypedDict):
+    """Parsed solar radiation forecast, see solar.py"""
+
+    time: list[datetime]
+    ghi: list[float]  # W/m²
+    direct: list[float]
+    diffuse: list[float]
+    kwh: list[float]  # energy of each hour, of the configured panels
+    energy: dict[str, float]  # local date -> kWh of the configured panels
+
+
+class HistoricalHourly(TypedDict):
+    """https://dev.qweather.com/docs/api/time-machine/time-machine-weather/"""
+
+    time: str  # "2020-07-25T00:00+08:00",
+    temp: str  # "24",
+    icon: str  # "100",
+    text: str  # "晴",
+    precip: str  # "0.0",
+    wind360: str  # "60",
+    windDir: str  # "东北风",
+    windScale: str  # "1",
+    windSpeed: str  # "4",
+    humidity: str  # "79",
+    pressure: str  # "1003"
+
+
+class StoredHistoryDay(TypedDict):
+    """Kept by HistoryStore, keyed by the local date, one column per field."""
+
+    time: list[int]  # timestamps of the hours
+    temp: list[float | None]
+    humidity: list[float | None]
+    precip: list[float | None]
+    windSpeed: list[float | None]
+    pressure: list[float | None]
+
+
+class StoredWarning(TypedDict):
+    """Kept by WarningStore, keyed by the warning id."""
+
+    title: str | None
+    text: str | None
+    pubTime: str | None
+    seen: int  # timestamp of the last poll the warning was active in
+
+
+class AreaWarning(TypedDict):
+    id: str
+    type: str | None  # typeName
+    severity: str | None  # severityColor
+
+
+class AreaWeather(TypedDict):
+    """Aggregated over the grid cells of a route or area, see area.py"""
+
+    cells: int
+    cell_size: float  # degrees, coarser than the grid for large areas
+    sampled: int  # cells with data
+    max_precipitation: float | None
+    max_precipitation_cell: str | None  # "116.40,39.90"
+    min_temperature: float | None
+    min_temperature_cell: str | None
+    max_wind_speed: float | None
+    max_wind_speed_cell: str | None
+    warnings: list[AreaWarning]
+
+
 class IndicesDailyItem(TypedDict):
     """https://dev.qweather.com/docs/api/indices/indices-forecast/"""
 
@@ -139,3 +269,17 @@ class IndicesDailyItem(TypedDict):
     text: (
         str | None
     )  # "天气较好，但考虑天气寒冷，风力较强，推荐您进行室内运动，若户外运动请注意保暖并做好准备活动。
+
+
+class AstronomyData(TypedDict):
+    """Computed locally, see astronomy.py"""
+
+    elevation: float  # 57.3
+    azimuth: float  # 181.2
+    is_daytime: bool
+    sunrise: datetime | None
+    sunset: datetime | None
+    moonrise: datetime | None
+    moonset: datetime | None
+    moon_phase: str  # "waxing_gibbous"
+    moon_illumination: float  # 87.5
@@ -0,0 +1,167 @@
+from collections import deque
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+import logging
+import math
+import time
+from typing import Any, TypeVar
+from uuid import uuid4
+
+from aiohttp import ClientError
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import (
+    TimestampDataUpdateCoordinator,
+    UpdateFailed,
+)
+import homeassistant.util.dt as dt_util
+from homeassistant.util.hass_dict import HassKey
+
+from .api import QWeatherError
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+_DataT = TypeVar("_DataT")
+
+# Poll this long after the expected publish time, to absorb publishing jitter.
+PUBLISH_DELAY = timedelta(seconds=90)
+# Never poll sooner than this after the previous poll.
+MIN_INTERVAL = timedelta(minutes=2)
+# Number of recent publish times the phase is learned from.
+PHASE_SAMPLES = 8
+# Poll this often while serving stale data, unless the interval is shorter.
+REVALIDATE_INTERVAL = timedelta(minutes=5)
+
+
+class VersionClock:
+    """Versions of the data of all locations, monotonic while Home Assistant runs.
+
+    Versions are only comparable within one `epoch`, it changes on every start.
+    """
+
+    def __init__(self) -> None:
+        self.epoch = uuid4().hex
+        self.version = 0
+
+    def tick(self) -> int:
+        self.version += 1
+        return self.version
+
+
+DATA_VERSION_CLOCK: HassKey[VersionClock] = HassKey(f"{DOMAIN}_version_clock")
+
+
+class QWeatherCoordinator(TimestampDataUpdateCoordinator[_DataT]):
+    """Polls just after the endpoint is expected to publish new data.
+
+    The endpoint publishes every `publish_period`, the phase within that period
+    is learned from the `updateTime` of recent responses. Polls stay at most
+    `update_interval` apart: each one is moved to just after the last publish
+    expected within the interval. Without a publish period, or until a phase is
+    known, it polls every `update_interval` like a plain coordinator.
+
+    When an update fails, the last good data keeps being served (stale) for up
+    to `max_stale`, while polling every REVALIDATE_INTERVAL to revalidate it.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        logger: logging.Logger,
+        *,
+        name: str,
+        update_method: Callable[[], Awaitable[_DataT]],
+        update_interval: timedelta,
+        publish_time: Callable[[], datetime | None],
+        publish_period: timedelta | None = None,
+        max_stale: timedelta | None = None,
+    ) -> None:
+        super().__init__(
+            hass,
+            logger,
+            name=name,
+            update_method=update_method,
+            update_interval=update_interval,
+        )
+        self.period = update_interval
+        self.publish_period = publish_period
+        self._publish_time = publish_time
+        self._last_published: datetime | None = None
+        self._phases: deque[float] = deque(maxlen=PHASE_SAMPLES)
+        self.max_stale = max_stale
+        self.last_good: datetime | None = None
+        self.stale = False
+
+    async def _async_update_data(self) -> _DataT:
+        try:
+            data = await super()._async_update_data()
+        except (QWeatherError, ClientError, TimeoutError) as err:
+            if (
+                not self.max_stale
+                or (age := self.data_age) is None
+                or age > self.max_stale
+            ):
+                self.stale = False
+                self.update_interval = self.period
+                raise UpdateFailed(f"{self.name}: {err!r}") from err
+            _LOGGER.debug("%s: serving %s old data (%r)", self.name, age, err)
+            self.stale = True
+            self.update_interval = min(self.period, REVALIDATE_INTERVAL)
+            return self.data
+
+        self.stale = False
+        self.last_good = dt_util.utcnow()
+        published = self._publish_time() if self.publish_period else None
+        if published is not None and published != self._last_published:
+            self._last_published = published
+            self._phases.append(
+                published.timestamp() % self.publish_period.total_seconds()
+            )
+        self.update_interval = self._next_interval()
+        return data
+
+    @property
+    def data_age(self) -> timedelta | None:
+        return dt_util.utcnow() - self.last_good if self.last_good else None
+
+    @property
+    def stale_attributes(self) -> dict[str, Any]:
+        """Extra state attributes of the entities while serving stale data."""
+        if not self.stale or (age := self.data_age) is None:
+            return {}
+        return {"stale": True, "data_age": int(age.total_seconds())}
+
+    @property
+    def phase(self) -> float | None:
+        """Circular mean of the learned publish phases, in seconds into the period."""
+        if not self._phases or not self.publish_period:
+            return None
+        period = self.publish_period.total_seconds()
+        angles = [2 * math.pi * phase / period for phase in self._phases]
+        mean = math.atan2(
+            sum(map(math.sin, angles)) / len(angles),
+            sum(map(math.cos, angles)) / len(angles),
+        )
+        return (mean / (2 * math.pi) * period) % period
+
+    def _next_interval(self) -> timedelta:
+        if (phase := self.phase) is None:
+            return self.period
+        period = self.publish_period.total_seconds()
+        now = time.time()
+        latest = now + self.period.total_seconds()
+        # Last poll slot (publish + delay) within the interval
+        target = latest - (latest - phase - PUBLISH_DELAY.total_seconds()) % period
+        if target < now:
+            # No slot within the interval, keep the plain interval
+            return self.period
+        # A slot just ahead is still worth waiting for, not a whole interval
+        target = max(target, now + MIN_INTERVAL.total_seconds())
+        _LOGGER.debug(
+            "%s: publish phase %.0fs, next poll in %.0fs",
+            self.name,
+            phase,
+            target - now,
+        )
+        return timedelta(seconds=target - now)
@@ -0,0 +1,228 @@
+"""Past hourly weather from the time machine API, kept locally to fill gaps."""
+
+import asyncio
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+import logging
+import time
+from typing import Any
+
+from aiohttp import ClientError
+
+from homeassistant.const import (
+    PERCENTAGE,
+    UnitOfPrecipitationDepth,
+    UnitOfPressure,
+    UnitOfSpeed,
+    UnitOfTemperature,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+import homeassistant.util.dt as dt_util
+
+from .api import QWeatherClient, QWeatherError
+from .const import DOMAIN, HistoricalHourly, StoredHistoryDay
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+# The API serves this many past days, today excluded.
+HISTORY_DAYS = 10
+# Days older than this are dropped from the store.
+RETENTION = timedelta(days=366)
+
+# Stored field -> statistic suffix and unit.
+FIELDS = {
+    "temp": ("temperature", UnitOfTemperature.CELSIUS),
+    "humidity": ("humidity", PERCENTAGE),
+    "precip": ("precipitation", UnitOfPrecipitationDepth.MILLIMETERS),
+    "windSpeed": ("wind_speed", UnitOfSpeed.KILOMETERS_PER_HOUR),
+    "pressure": ("pressure", UnitOfPressure.HPA),
+}
+
+
+async def async_remove_store(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the stored history of a removed config entry."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}_history_{entry_id}").async_remove()
+
+
+class HistoryStore:
+    """Hourly history by local date, stored as one column per field.
+
+    Loaded on first use, it is not needed for the regular polling.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: QWeatherClient,
+        entry_id: str,
+        unique_id: str,
+        name: str,
+    ) -> None:
+        self.hass = hass
+        self.client = client
+        self.unique_id = unique_id
+        self.name = name
+        self._store = Store[dict[str, StoredHistoryDay]](
+            hass, STORAGE_VERSION, f"{DOMAIN}_history_{entry_id}"
+        )
+        self._days: dict[str, StoredHistoryDay] | None = None
+
+    async def async_load(self) -> dict[str, StoredHistoryDay]:
+        if self._days is None:
+            self._days = await self._store.async_load() or {}
+        return self._days
+
+    async def async_backfill(self, start: date, end: date) -> dict[str, list[str]]:
+        """Fetch the days of [start, end] not stored yet, concurrently."""
+        days = await self.async_load()
+        today = dt_util.now().date()
+        first = today - timedelta(days=HISTORY_DAYS)
+        requested = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        missing = [
+            day
+            for day in requested
+            if first <= day < today and day.isoformat() not in days
+        ]
+        fetched: list[str] = []
+        failed: list[str] = []
+        if missing:
+            try:
+                location_id = await self.client.location_id()
+            except (QWeatherError, ClientError, TimeoutError) as err:
+                raise HomeAssistantError(
+                    f"Failed to look up the LocationID: {err!r}"
+                ) from err
+            if location_id is None:
+                raise HomeAssistantError("No LocationID found for the location")
+            results = await asyncio.gather(
+                *(self._fetch(location_id, day) for day in missing)
+            )
+            received = {
+                day.isoformat(): hourly
+                for day, hourly in zip(missing, results, strict=True)
+                if hourly
+            }
+            failed = [
+                day.isoformat() for day in missing if day.isoformat() not in received
+            ]
+            started = time.perf_counter()
+            # Up to HISTORY_DAYS * 24 timestamps to parse, off the event loop
+            columns = await self.hass.async_add_executor_job(
+                lambda: {key: _to_columns(hourly) for key, hourly in received.items()}
+            )
+            _LOGGER.debug(
+                "Converted %d days in the executor in %.2f ms",
+                len(columns),
+                (time.perf_counter() - started) * 1000,
+            )
+            days.update(columns)
+            fetched = list(columns)
+            self._prune(today)
+            await self._store.async_save(days)
+
+        _LOGGER.debug("Backfilled %s, failed %s", fetched, failed)
+        return {
+            "fetched": fetched,
+            "skipped": [
+                day.isoformat()
+                for day in requested
+                if day.isoformat() in days and day.isoformat() not in fetched
+            ],
+            "failed": failed,
+            "unavailable": [
+                day.isoformat()
+                for day in requested
+                if not first <= day < today and day.isoformat() not in days
+            ],
+        }
+
+    async def async_import_statistics(self, start: date, end: date) -> int:
+        """Import the stored hours of [start, end], one batch per field.
+
+        Returns the number of hours imported, those with at least one value.
+        """
+        # Imported here, the recorder is only needed when importing.
+        from homeassistant.components.recorder.models import (
+            StatisticData,
+            StatisticMetaData,
+        )
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        if "recorder" not in self.hass.config.components:
+            raise HomeAssistantError("The recorder is not loaded")
+
+        days = await self.async_load()
+        stored = [
+            days[key]
+            for key in sorted(days)
+            if start.isoformat() <= key <= end.isoformat()
+        ]
+        hours = [
+            dt_util.utc_from_timestamp(timestamp)
+            for day in stored
+            for timestamp in day["time"]
+        ]
+        imported: set[datetime] = set()
+        for field, (suffix, unit) in FIELDS.items():
+            values = (value for day in stored for value in day[field])
+            statistics = [
+                StatisticData(start=hour, mean=value, min=value, max=value)
+                for hour, value in zip(hours, values, strict=True)
+                if value is not None
+            ]
+            if not statistics:
+                continue
+            # unique_id may hold "-" and other characters not valid in an id
+            async_add_external_statistics(
+                self.hass,
+                StatisticMetaData(
+                    has_mean=True,
+                    has_sum=False,
+                    name=f"{self.name} {suffix.replace('_', ' ')}",
+                    source=DOMAIN,
+                    statistic_id=f"{DOMAIN}:{slugify(f'{self.unique_id}_{suffix}')}",
+                    unit_of_measurement=unit,
+                ),
+                statistics,
+            )
+            imported.update(statistic["start"] for statistic in statistics)
+        return len(imported)
+
+    async def _fetch(self, location_id: str, day: date) -> list[HistoricalHourly]:
+        try:
+            async with self.client.bulk_limiter:
+                return await self.client.historical_weather(location_id, day)
+        except (QWeatherError, ClientError, TimeoutError) as err:
+            _LOGGER.debug("Failed to fetch the history of %s: %r", day, err)
+            return []
+
+    def _prune(self, today: date) -> None:
+        oldest = (today - RETENTION).isoformat()
+        for key in [key for key in self._days or {} if key < oldest]:
+            del self._days[key]
+
+
+def _to_columns(hourly: Iterable[HistoricalHourly]) -> StoredHistoryDay:
+    hours = sorted(
+        hourly, key=lambda item: datetime.fromisoformat(item["time"]).timestamp()
+    )
+    return {
+        "time": [
+            int(datetime.fromisoformat(item["time"]).timestamp()) for item in hours
+        ],
+        **{field: [_float(item.get(field)) for item in hours] for field in FIELDS},
+    }
+
+
+def _float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -1,22 +1,42 @@
-from collections.abc import Callable
-from datetime import date, datetime
+from collections.abc import Callable, Mapping
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 import logging
-from typing import Generic, TypeVar
+from typing import Any, Generic, TypeVar
 
-from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
-from homeassistant.const import CONF_NAME, EntityCategory, Platform
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    CONF_NAME,
+    DEGREE,
+    EntityCategory,
+    Platform,
+    UnitOfEnergy,
+    UnitOfIrradiance,
+    UnitOfPrecipitationDepth,
+    UnitOfSpeed,
+    UnitOfTemperature,
+)
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_utc_time_change
 from homeassistant.helpers.typing import StateType
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
 )
+import homeassistant.util.dt as dt_util
 
 from . import Coordinators, QWeatherConfigEntry
-from .const import DOMAIN
+from .astronomy import MOON_PHASES
+from .const import DOMAIN, AreaWeather, AstronomyData, SolarForecast
+from .coordinator import QWeatherCoordinator
+from .solar import current_index, remaining_energy
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,8 +47,9 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ):
     coordinators: Coordinators = config_entry.runtime_data
-    async_add_entities(
-        [
+    entities: list[QSensor] = []
+    if coordinators.minutely_precipitation:
+        entities.append(
             QSensor(
                 coordinators.minutely_precipitation,
                 SensorEntityDescription(
@@ -40,8 +61,151 @@ async def async_setup_entry(
                 config_entry,
                 lambda data: data.get("summary") if data else None,
             )
-        ]
-    )
+        )
+    if coordinators.astronomy:
+        entities.extend(
+            QSensor(coordinators.astronomy, description, config_entry, value_func)
+            for description, value_func in ASTRONOMY_SENSORS
+        )
+    if coordinators.area:
+        entities.extend(
+            QAreaSensor(coordinators.area, description, config_entry)
+            for description in AREA_SENSORS
+        )
+    if coordinators.solar_radiation:
+        entities.extend(
+            QSolarSensor(
+                coordinators.solar_radiation, description, config_entry, value_func
+            )
+            for description, value_func in SOLAR_SENSORS
+        )
+    async_add_entities(entities)
+
+
+ASTRONOMY_SENSORS: list[
+    tuple[SensorEntityDescription, Callable[[AstronomyData | None], Any]]
+] = [
+    (
+        SensorEntityDescription(
+            key="solar_elevation",
+            icon="mdi:weather-sunny",
+            native_unit_of_measurement=DEGREE,
+            state_class=SensorStateClass.MEASUREMENT,
+            translation_key="solar_elevation",
+        ),
+        lambda data: data.get("elevation") if data else None,
+    ),
+    (
+        SensorEntityDescription(
+            key="solar_azimuth",
+            icon="mdi:sun-angle",
+            native_unit_of_measurement=DEGREE,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_registry_enabled_default=False,
+            translation_key="solar_azimuth",
+        ),
+        lambda data: data.get("azimuth") if data else None,
+    ),
+    *(
+        (
+            SensorEntityDescription(
+                key=key,
+                icon=icon,
+                device_class=SensorDeviceClass.TIMESTAMP,
+                translation_key=key,
+            ),
+            lambda data, key=key: data.get(key) if data else None,
+        )
+        for key, icon in (
+            ("sunrise", "mdi:weather-sunset-up"),
+            ("sunset", "mdi:weather-sunset-down"),
+            ("moonrise", "mdi:weather-night"),
+            ("moonset", "mdi:weather-night"),
+        )
+    ),
+    (
+        SensorEntityDescription(
+            key="moon_phase",
+            icon="mdi:moon-waning-crescent",
+            device_class=SensorDeviceClass.ENUM,
+            options=MOON_PHASES,
+            translation_key="moon_phase",
+        ),
+        lambda data: data.get("moon_phase") if data else None,
+    ),
+]
+
+# Key without "area_" is the AreaWeather field, "<field>_cell" is where it was sampled.
+AREA_SENSORS = [
+    SensorEntityDescription(
+        key="area_max_precipitation",
+        icon="mdi:weather-pouring",
+        device_class=SensorDeviceClass.PRECIPITATION,
+        native_unit_of_measurement=UnitOfPrecipitationDepth.MILLIMETERS,
+        state_class=SensorStateClass.MEASUREMENT,
+        translation_key="area_max_precipitation",
+    ),
+    SensorEntityDescription(
+        key="area_min_temperature",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        state_class=SensorStateClass.MEASUREMENT,
+        translation_key="area_min_temperature",
+    ),
+    SensorEntityDescription(
+        key="area_max_wind_speed",
+        icon="mdi:weather-windy",
+        device_class=SensorDeviceClass.WIND_SPEED,
+        native_unit_of_measurement=UnitOfSpeed.KILOMETERS_PER_HOUR,
+        state_class=SensorStateClass.MEASUREMENT,
+        translation_key="area_max_wind_speed",
+    ),
+]
+
+# Evaluated at the current time, see QSolarSensor.
+SOLAR_SENSORS: list[
+    tuple[SensorEntityDescription, Callable[[SolarForecast | None], Any]]
+] = [
+    (
+        SensorEntityDescription(
+            key="solar_irradiance",
+            icon="mdi:solar-power-variant",
+            device_class=SensorDeviceClass.IRRADIANCE,
+            native_unit_of_measurement=UnitOfIrradiance.WATTS_PER_SQUARE_METER,
+            state_class=SensorStateClass.MEASUREMENT,
+            translation_key="solar_irradiance",
+        ),
+        lambda data: (
+            data["ghi"][index]
+            if data and (index := current_index(data, dt_util.utcnow())) is not None
+            else None
+        ),
+    ),
+    (
+        SensorEntityDescription(
+            key="solar_energy_remaining_today",
+            icon="mdi:solar-power",
+            device_class=SensorDeviceClass.ENERGY,
+            native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+            translation_key="solar_energy_remaining_today",
+        ),
+        lambda data: remaining_energy(data, dt_util.utcnow()) if data else None,
+    ),
+    (
+        SensorEntityDescription(
+            key="solar_energy_tomorrow",
+            icon="mdi:solar-power",
+            device_class=SensorDeviceClass.ENERGY,
+            native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+            translation_key="solar_energy_tomorrow",
+        ),
+        lambda data: (
+            data["energy"].get((dt_util.now().date() + timedelta(days=1)).isoformat())
+            if data
+            else None
+        ),
+    ),
+]
 
 
 _DataT = TypeVar("_DataT")
@@ -72,6 +236,12 @@ class QSensor(CoordinatorEntity, SensorEntity, Generic[_DataT]):
 
         self._async_update_attrs(self.coordinator.data)
 
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        if isinstance(self.coordinator, QWeatherCoordinator):
+            return self.coordinator.stale_attributes or None
+        return None
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
@@ -81,3 +251,77 @@ class QSensor(CoordinatorEntity, SensorEntity, Generic[_DataT]):
     @callback
     def _async_update_attrs(self, data: _DataT):
         self._attr_native_value = self.value_func(data)
+
+
+class QAreaSensor(QSensor[AreaWeather]):
+    """Extreme value over the sampled cells of the configured route or area."""
+
+    def __init__(
+        self,
+        coordinator: DataUpdateCoordinator[AreaWeather],
+        description: SensorEntityDescription,
+        config_entry: QWeatherConfigEntry,
+    ):
+        self.field = description.key.removeprefix("area_")
+        super().__init__(
+            coordinator,
+            description,
+            config_entry,
+            lambda data: data.get(self.field) if data else None,
+        )
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        data: AreaWeather | None = self.coordinator.data
+        if not data:
+            return super().extra_state_attributes
+        return {
+            "cell": data.get(f"{self.field}_cell"),
+            "cells": data["cells"],
+            "cell_size": data["cell_size"],
+            "sampled": data["sampled"],
+            **(super().extra_state_attributes or {}),
+        }
+
+
+class QSolarSensor(QSensor[SolarForecast]):
+    """Re-evaluated every hour, the forecast itself is polled a few times a day.
+
+    The remaining energy of today counts down within the hour, it is re-evaluated
+    every 5 minutes. The hourly series are attributes of the irradiance sensor
+    only, and are not recorded.
+    """
+
+    _unrecorded_attributes = frozenset({"time", "ghi", "direct", "diffuse", "kwh"})
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_utc_time_change(
+                self.hass,
+                self._async_time_changed,
+                minute="/5"
+                if self.entity_description.key == "solar_energy_remaining_today"
+                else 0,
+                second=0,
+            )
+        )
+
+    @callback
+    def _async_time_changed(self, _now: datetime) -> None:
+        self._async_update_attrs(self.coordinator.data)
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        data: SolarForecast | None = self.coordinator.data
+        if self.entity_description.key != "solar_irradiance" or not data:
+            return super().extra_state_attributes
+        return {
+            "time": [moment.isoformat() for moment in data["time"]],
+            "ghi": data["ghi"],
+            "direct": data["direct"],
+            "diffuse": data["diffuse"],
+            "kwh": [round(kwh, 3) for kwh in data["kwh"]],
+            **(super().extra_state_attributes or {}),
+        }
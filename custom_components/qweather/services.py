@@ -0,0 +1,182 @@
+from datetime import timedelta
+from http import HTTPStatus
+import logging
+from typing import Any
+
+from aiohttp import web
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+from .coordinator import DATA_VERSION_CLOCK
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_GET_WARNINGS = "get_warnings"
+ATTR_WARNING_ID = "warning_id"
+
+SERVICE_BACKFILL_HISTORY = "backfill_history"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+ATTR_IMPORT_STATISTICS = "import_statistics"
+
+GET_WARNINGS_SCHEMA = vol.Schema(
+    {vol.Required(ATTR_WARNING_ID): vol.All(cv.ensure_list, [cv.string])}
+)
+
+BACKFILL_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_START_DATE): cv.date,
+        vol.Optional(ATTR_END_DATE): cv.date,
+        vol.Optional(ATTR_IMPORT_STATISTICS, default=True): cv.boolean,
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    async def async_get_warnings(call: ServiceCall) -> ServiceResponse:
+        return {"warnings": _get_warnings(hass, call.data[ATTR_WARNING_ID])}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_WARNINGS,
+        async_get_warnings,
+        schema=GET_WARNINGS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    websocket_api.async_register_command(hass, ws_get_warnings)
+    websocket_api.async_register_command(hass, ws_snapshot)
+    hass.http.register_view(QWeatherSnapshotView)
+
+    async def async_backfill_history(call: ServiceCall) -> ServiceResponse:
+        start = call.data[ATTR_START_DATE]
+        end = call.data.get(ATTR_END_DATE, dt_util.now().date() - timedelta(days=1))
+        if start > end:
+            raise HomeAssistantError("start_date is after end_date")
+        results = {}
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            if entry.state is not ConfigEntryState.LOADED:
+                continue
+            history = entry.runtime_data.history_store(entry)
+            result: dict[str, Any] = {}
+            try:
+                result.update(await history.async_backfill(start, end))
+                if call.data[ATTR_IMPORT_STATISTICS]:
+                    result["imported_hours"] = await history.async_import_statistics(
+                        start, end
+                    )
+            except HomeAssistantError as err:
+                # One failing location does not abort the others.
+                _LOGGER.warning("Failed to backfill %s: %s", entry.title, err)
+                result["error"] = str(err)
+            results[entry.unique_id] = result
+        return results
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BACKFILL_HISTORY,
+        async_backfill_history,
+        schema=BACKFILL_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/warnings",
+        vol.Required(ATTR_WARNING_ID): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+@callback
+def ws_get_warnings(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Full title and text of weather warnings, by id."""
+    connection.send_result(
+        msg["id"], {"warnings": _get_warnings(hass, msg[ATTR_WARNING_ID])}
+    )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/snapshot",
+        vol.Optional("epoch"): str,
+        vol.Optional("since"): vol.Coerce(int),
+    }
+)
+@callback
+def ws_snapshot(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Latest data of all locations, from the coordinators' memory."""
+    connection.send_result(
+        msg["id"], _snapshot(hass, msg.get("epoch"), msg.get("since"))
+    )
+
+
+class QWeatherSnapshotView(HomeAssistantView):
+    """Same as the qweather/snapshot websocket command, `?epoch=...&since=...`."""
+
+    url = f"/api/{DOMAIN}/snapshot"
+    name = f"api:{DOMAIN}:snapshot"
+
+    @callback
+    def get(self, request: web.Request) -> web.Response:
+        since = request.query.get("since")
+        if since is not None and not since.isdigit():
+            return self.json_message("Invalid since", HTTPStatus.BAD_REQUEST)
+        hass: HomeAssistant = request.app[KEY_HASS]
+        return self.json(
+            _snapshot(hass, request.query.get("epoch"), int(since) if since else None)
+        )
+
+
+def _snapshot(
+    hass: HomeAssistant, epoch: str | None, since: int | None
+) -> dict[str, Any]:
+    """Collect the feeds changed after `since`, by location (entry unique_id).
+
+    Versions come from one clock shared by all locations and kept across reloads.
+    A `since` of another epoch (before a restart), or without one, gets the full
+    snapshot.
+    """
+    clock = hass.data[DATA_VERSION_CLOCK]
+    if epoch != clock.epoch:
+        since = None
+    return {
+        "epoch": clock.epoch,
+        "version": clock.version,
+        "locations": {
+            entry.unique_id: entry.runtime_data.snapshot(since)
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if entry.state is ConfigEntryState.LOADED
+        },
+    }
+
+
+def _get_warnings(hass: HomeAssistant, warning_ids: list[str]) -> list[dict[str, Any]]:
+    return [
+        {"id": warning_id, **stored}
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED and entry.runtime_data.warnings
+        for warning_id in warning_ids
+        if (stored := entry.runtime_data.warnings.async_get(warning_id))
+    ]
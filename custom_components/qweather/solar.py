@@ -0,0 +1,82 @@
+"""Solar radiation forecast, and the PV energy it yields for the configured panels."""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import logging
+
+import homeassistant.util.dt as dt_util
+
+from .const import SolarForecast, SolarRadiation
+
+_LOGGER = logging.getLogger(__name__)
+
+# Irradiance of the standard test conditions panels are rated at, W/m².
+STC_IRRADIANCE = 1000
+HOUR = timedelta(hours=1)
+
+
+def parse_radiation(
+    radiation: list[SolarRadiation], peak_power: float, performance_ratio: float
+) -> SolarForecast:
+    """Hourly series as parallel columns, and the energy of each local day.
+
+    Global horizontal irradiance is direct + diffuse, the energy of an hour is
+    GHI / STC_IRRADIANCE * kWp * performance ratio, in kWh.
+    """
+    times: list[datetime] = []
+    ghi: list[float] = []
+    direct: list[float] = []
+    diffuse: list[float] = []
+    kwh: list[float] = []
+    energy: dict[str, float] = {}
+    for item in radiation:
+        moment = datetime.fromisoformat(item["fxTime"])
+        hour_direct = _float(item.get("direct"))
+        hour_diffuse = _float(item.get("diffuse"))
+        times.append(moment)
+        direct.append(hour_direct)
+        diffuse.append(hour_diffuse)
+        ghi.append(hour_direct + hour_diffuse)
+        kwh.append(ghi[-1] / STC_IRRADIANCE * peak_power * performance_ratio)
+        day = dt_util.as_local(moment).date().isoformat()
+        energy[day] = energy.get(day, 0) + kwh[-1]
+    return {
+        "time": times,
+        "ghi": ghi,
+        "direct": direct,
+        "diffuse": diffuse,
+        "kwh": kwh,
+        "energy": {day: round(total, 2) for day, total in energy.items()},
+    }
+
+
+def current_index(forecast: SolarForecast, now: datetime) -> int | None:
+    """Index of the hour `now` is in, None when outside of the forecast."""
+    index = bisect_right(forecast["time"], now) - 1
+    return index if index >= 0 and now - forecast["time"][index] < HOUR else None
+
+
+def remaining_energy(forecast: SolarForecast, now: datetime) -> float | None:
+    """Energy in kWh from `now` to the end of the local day.
+
+    Only the part of the current hour still to come is counted.
+    """
+    if not forecast["time"] or forecast["time"][-1] + HOUR <= now:
+        return None
+    today = dt_util.as_local(now).date()
+    return round(
+        sum(
+            kwh * min((moment + HOUR - now) / HOUR, 1)
+            for moment, kwh in zip(forecast["time"], forecast["kwh"], strict=True)
+            if moment + HOUR > now and dt_util.as_local(moment).date() == today
+        ),
+        2,
+    )
+
+
+def _float(value: str | None) -> float:
+    try:
+        return max(float(value), 0) if value is not None else 0
+    except ValueError:
+        _LOGGER.debug("Invalid irradiance: %r", value)
+        return 0
@@ -0,0 +1,74 @@
+from datetime import timedelta
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN, StoredWarning, WeatherWarning
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 300  # seconds
+
+# Warnings not seen for this long are dropped.
+RETENTION = timedelta(days=7)
+
+
+async def async_remove_store(hass: HomeAssistant, entry_id: str) -> None:
+    """Delete the stored warnings of a removed config entry."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}_warnings_{entry_id}").async_remove()
+
+
+class WarningStore:
+    """Full title and text of the weather warnings, deduplicated by warning id.
+
+    Keeps these long texts out of the state attributes, and so out of the recorder.
+    Only new and dropped warnings are saved, `seen` alone changes on every poll;
+    a warning pruned by an outdated `seen` is added back by the next poll.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store = Store[dict[str, StoredWarning]](
+            hass, STORAGE_VERSION, f"{DOMAIN}_warnings_{entry_id}"
+        )
+        self._warnings: dict[str, StoredWarning] = {}
+
+    async def async_load(self) -> None:
+        self._warnings = await self._store.async_load() or {}
+        self._prune()
+
+    @callback
+    def async_add(self, warnings: list[WeatherWarning] | None) -> None:
+        """Store new warnings, and refresh when the known ones were last seen."""
+        seen = int(dt_util.utcnow().timestamp())
+        changed = False
+        for warning in warnings or []:
+            if stored := self._warnings.get(warning["id"]):
+                stored["seen"] = seen
+            else:
+                self._warnings[warning["id"]] = {
+                    "title": warning.get("title"),
+                    "text": warning.get("text"),
+                    "pubTime": warning.get("pubTime"),
+                    "seen": seen,
+                }
+                changed = True
+        if self._prune() or changed:
+            self._store.async_delay_save(lambda: self._warnings, SAVE_DELAY)
+
+    @callback
+    def async_get(self, warning_id: str) -> StoredWarning | None:
+        return self._warnings.get(warning_id)
+
+    def _prune(self) -> bool:
+        oldest = (dt_util.utcnow() - RETENTION).timestamp()
+        expired = [
+            warning_id
+            for warning_id, stored in self._warnings.items()
+            if stored["seen"] < oldest
+        ]
+        for warning_id in expired:
+            del self._warnings[warning_id]
+        return bool(expired)
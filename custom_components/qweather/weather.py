@@ -1,5 +1,8 @@
+from collections.abc import Mapping
+from datetime import datetime
 import logging
-from typing import Any
+import time
+from typing import Any, NamedTuple
 
 from homeassistant.components.weather import (
     ATTR_CONDITION_CLEAR_NIGHT,
@@ -25,10 +28,18 @@ from homeassistant.const import (
     UnitOfSpeed,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 import homeassistant.util.dt as dt_util
+from homeassistant.util.unit_conversion import (
+    BaseUnitConverter,
+    DistanceConverter,
+    PressureConverter,
+    SpeedConverter,
+    TemperatureConverter,
+)
 
 from . import Coordinators, QWeatherConfigEntry
 from .const import (
@@ -43,7 +54,28 @@ from .const import (
 
 _LOGGER = logging.getLogger(__name__)
 
-DEFAULT_TIME = dt_util.now()
+# Coordinator updates within this window are merged into one state write, e.g.
+# at startup or when several intervals line up. Forecasts are still pushed to
+# their subscribers by CoordinatorWeatherEntity, once per forecast update.
+COALESCE_DELAY = 1.0  # seconds
+
+
+class Units(NamedTuple):
+    temperature: str
+    pressure: str
+    wind_speed: str
+    visibility: str
+    precipitation: str
+
+
+# Units of the values the API returns
+API_UNITS = Units(
+    UnitOfTemperature.CELSIUS,
+    UnitOfPressure.HPA,
+    UnitOfSpeed.KILOMETERS_PER_HOUR,
+    UnitOfLength.KILOMETERS,
+    UnitOfLength.MILLIMETERS,
+)
 
 
 async def async_setup_entry(
@@ -63,14 +95,16 @@ async def async_setup_entry(
 
 
 class QWeatherEntity(CoordinatorWeatherEntity):
-    """Representation of a weather condition."""
+    """Representation of a weather condition.
+
+    Values are converted to the units shown to the user once per update, and
+    those are reported as the native units: the conversion Home Assistant does
+    on every forecast request and subscription push has nothing left to do.
+    """
 
     _attr_attribution: str | None = ATTRIBUTION
     _attr_has_entity_name: bool = True
     _attr_name: str | None = None
-    _attr_supported_features: int | None = (
-        WeatherEntityFeature.FORECAST_DAILY | WeatherEntityFeature.FORECAST_HOURLY
-    )
 
     _attr_precision: float = 1
     _attr_native_pressure_unit: str | None = UnitOfPressure.HPA
@@ -78,6 +112,7 @@ class QWeatherEntity(CoordinatorWeatherEntity):
     _attr_native_visibility_unit: str | None = UnitOfLength.KILOMETERS
     _attr_native_precipitation_unit: str | None = UnitOfLength.MILLIMETERS
     _attr_native_wind_speed_unit: str | None = UnitOfSpeed.KILOMETERS_PER_HOUR
+    _unrecorded_attributes = frozenset({"saved_writes"})
 
     def __init__(self, coordinators: Coordinators, name: str, unique_id: str):
         """Initialize the weather."""
@@ -95,30 +130,135 @@ class QWeatherEntity(CoordinatorWeatherEntity):
             name=name,
         )
 
+        self._attr_supported_features = WeatherEntityFeature(0)
         self._forecast_daily: list[Forecast] | None = None
         self._forecast_hourly: list[Forecast] | None = None
+        # Units of the native values, the display units are only known once added
+        self._units = API_UNITS
+
+        self._cancel_write: CALLBACK_TYPE | None = None
+        self._pending_updates = 0
+        # State writes saved by coalescing since the entity was created, exposed
+        # as the saved_writes attribute.
+        self.saved_writes = 0
 
         self._update_weather_now(coordinators.observation.data)
-        self._update_weather_daily(coordinators.daily_forecast.data)
-        self._update_weather_hourly(coordinators.hourly_forecast.data)
+        if coordinators.daily_forecast:
+            self._attr_supported_features |= WeatherEntityFeature.FORECAST_DAILY
+            self._update_weather_daily(coordinators.daily_forecast.data)
+        if coordinators.hourly_forecast:
+            self._attr_supported_features |= WeatherEntityFeature.FORECAST_HOURLY
+            self._update_weather_hourly(coordinators.hourly_forecast.data)
 
-        self._update_air_now(coordinators.air_now.data)
+        if coordinators.air_now:
+            self._update_air_now(coordinators.air_now.data)
 
     async def async_added_to_hass(self) -> None:
         """When entity is added to hass."""
         await super().async_added_to_hass()
-        self.async_on_remove(
-            self.coordinators.air_now.async_add_listener(
-                self._handle_air_now_coordinator_update
+        self._async_update_units()
+        self.async_on_remove(self._async_cancel_write)
+        if self.coordinators.air_now:
+            self.async_on_remove(
+                self.coordinators.air_now.async_add_listener(
+                    self._handle_air_now_coordinator_update
+                )
             )
-        )
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         _LOGGER.debug("_handle_coordinator_update")
+        self._async_update_units()
+        self._update_weather_now(self.coordinators.observation.data)
+        self._async_schedule_write()
+
+    @callback
+    def _async_schedule_write(self) -> None:
+        """Write the state at the end of the coalescing window."""
+        self._pending_updates += 1
+        if self._cancel_write is None:
+            self._cancel_write = async_call_later(
+                self.hass, COALESCE_DELAY, self._async_write_coalesced
+            )
+
+    @callback
+    def _async_write_coalesced(self, _now: datetime) -> None:
+        self._cancel_write = None
+        if self._pending_updates > 1:
+            self.saved_writes += self._pending_updates - 1
+            _LOGGER.debug(
+                "%s coalesced %d updates into one state write "
+                "(%d writes saved in total)",
+                self.entity_id,
+                self._pending_updates,
+                self.saved_writes,
+            )
+        self._pending_updates = 0
+        self._async_update_units()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_cancel_write(self) -> None:
+        if self._cancel_write:
+            self._cancel_write()
+            self._cancel_write = None
+
+    @callback
+    def _async_update_units(self) -> None:
+        """Rebuild every value in the display units, when those changed."""
+        if (units := self._display_units()) == self._units:
+            return
+        self._units = units
+        (
+            self._attr_native_temperature_unit,
+            self._attr_native_pressure_unit,
+            self._attr_native_wind_speed_unit,
+            self._attr_native_visibility_unit,
+            self._attr_native_precipitation_unit,
+        ) = units
         self._update_weather_now(self.coordinators.observation.data)
-        super()._handle_coordinator_update()
+        if self.coordinators.daily_forecast:
+            self._update_weather_daily(self.coordinators.daily_forecast.data)
+        if self.coordinators.hourly_forecast:
+            self._update_weather_hourly(self.coordinators.hourly_forecast.data)
+
+    def _display_units(self) -> Units:
+        return Units(
+            self._temperature_unit,
+            self._pressure_unit,
+            self._wind_speed_unit,
+            self._visibility_unit,
+            self._precipitation_unit,
+        )
+
+    def _temperature(self, value: str | None) -> float | None:
+        return convert(
+            value, TemperatureConverter, API_UNITS.temperature, self._units.temperature
+        )
+
+    def _pressure(self, value: str | None) -> float | None:
+        return convert(
+            value, PressureConverter, API_UNITS.pressure, self._units.pressure
+        )
+
+    def _wind_speed(self, value: str | None) -> float | None:
+        return convert(
+            value, SpeedConverter, API_UNITS.wind_speed, self._units.wind_speed
+        )
+
+    def _visibility(self, value: str | None) -> float | None:
+        return convert(
+            value, DistanceConverter, API_UNITS.visibility, self._units.visibility
+        )
+
+    def _precipitation(self, value: str | None) -> float | None:
+        return convert(
+            value,
+            DistanceConverter,
+            API_UNITS.precipitation,
+            self._units.precipitation,
+        )
 
     def _update_weather_now(self, weather_now: RealtimeWeather | None):
         if not weather_now:
@@ -127,15 +267,15 @@ class QWeatherEntity(CoordinatorWeatherEntity):
         self._attr_humidity = maybe_float(weather_now.get("humidity"))
         self._attr_cloud_coverage = maybe_int(weather_now.get("cloud"))
         self._attr_wind_bearing = maybe_float(weather_now.get("wind360"))
-        self._attr_native_pressure = maybe_float(weather_now.get("pressure"))
-        self._attr_native_apparent_temperature = maybe_float(
+        self._attr_native_pressure = self._pressure(weather_now.get("pressure"))
+        self._attr_native_apparent_temperature = self._temperature(
             weather_now.get("feelsLike")
         )
-        self._attr_native_temperature = maybe_float(weather_now.get("temp"))
-        self._attr_native_visibility = maybe_float(weather_now.get("vis"))
+        self._attr_native_temperature = self._temperature(weather_now.get("temp"))
+        self._attr_native_visibility = self._visibility(weather_now.get("vis"))
         # self._attr_native_wind_gust_speed
-        self._attr_native_wind_speed = maybe_float(weather_now.get("windSpeed"))
-        self._attr_native_dew_point = maybe_float(weather_now.get("dew"))
+        self._attr_native_wind_speed = self._wind_speed(weather_now.get("windSpeed"))
+        self._attr_native_dew_point = self._temperature(weather_now.get("dew"))
 
         self._update_extra_weather_now(weather_now)
 
@@ -143,10 +283,13 @@ class QWeatherEntity(CoordinatorWeatherEntity):
     def _handle_daily_forecast_coordinator_update(self) -> None:
         """Handle updated data from the daily forecast coordinator."""
         _LOGGER.debug("_handle_daily_forecast_coordinator_update")
+        self._async_update_units()
+        started = time.perf_counter()
         self._update_weather_daily(self.coordinators.daily_forecast.data)
-        self.async_write_ha_state()
+        _log_blocking("daily", self._forecast_daily, started)
+        self._async_schedule_write()
 
-    def _update_weather_daily(self, weather_daily: list[DailyForecast]) -> None:
+    def _update_weather_daily(self, weather_daily: list[DailyForecast] | None) -> None:
         self._forecast_daily = [
             Forecast(
                 condition=CONDITION_MAP.get(daily.get("iconDay")),
@@ -154,19 +297,19 @@ class QWeatherEntity(CoordinatorWeatherEntity):
                 humidity=maybe_float(daily.get("humidity")),
                 # precipitation_probability=,
                 cloud_coverage=maybe_float(daily.get("cloud")),
-                native_precipitation=maybe_float(daily.get("precip")),
-                native_pressure=maybe_float(daily.get("pressure")),
-                native_temperature=maybe_float(daily.get("tempMax")),
-                native_templow=maybe_float(daily.get("tempMin")),
+                native_precipitation=self._precipitation(daily.get("precip")),
+                native_pressure=self._pressure(daily.get("pressure")),
+                native_temperature=self._temperature(daily.get("tempMax")),
+                native_templow=self._temperature(daily.get("tempMin")),
                 # native_apparent_temperature=,
                 wind_bearing=maybe_float(daily.get("wind360Day")),
                 # native_wind_gust_speed=,
-                native_wind_speed=maybe_float(daily.get("windSpeedDay")),
+                native_wind_speed=self._wind_speed(daily.get("windSpeedDay")),
                 # native_dew_point=,
                 uv_index=maybe_float(daily.get("uvIndex")),
                 # is_daytime=,
             )
-            for daily in weather_daily
+            for daily in weather_daily or []
         ]
 
         if weather_daily:
@@ -176,10 +319,13 @@ class QWeatherEntity(CoordinatorWeatherEntity):
     def _handle_hourly_forecast_coordinator_update(self) -> None:
         """Handle updated data from the hourly forecast coordinator."""
         _LOGGER.debug("_handle_hourly_forecast_coordinator_update")
+        self._async_update_units()
+        started = time.perf_counter()
         self._update_weather_hourly(self.coordinators.hourly_forecast.data)
-        self.async_write_ha_state()
+        _log_blocking("hourly", self._forecast_hourly, started)
+        self._async_schedule_write()
 
-    def _update_weather_hourly(self, weather_hourly: list[HourlyForecast]):
+    def _update_weather_hourly(self, weather_hourly: list[HourlyForecast] | None):
         self._forecast_hourly = [
             Forecast(
                 condition=CONDITION_MAP.get(hourly.get("icon")),
@@ -187,29 +333,35 @@ class QWeatherEntity(CoordinatorWeatherEntity):
                 humidity=maybe_float(hourly.get("humidity")),
                 precipitation_probability=maybe_int(hourly.get("pop")),
                 cloud_coverage=maybe_float(hourly.get("cloud")),
-                native_precipitation=maybe_float(hourly.get("precip")),
-                native_pressure=maybe_float(hourly.get("pressure")),
-                native_temperature=maybe_float(hourly.get("temp")),
+                native_precipitation=self._precipitation(hourly.get("precip")),
+                native_pressure=self._pressure(hourly.get("pressure")),
+                native_temperature=self._temperature(hourly.get("temp")),
                 # native_templow=,
                 # native_apparent_temperature=,
                 wind_bearing=maybe_float(hourly.get("wind360")),
                 # native_wind_gust_speed=,
-                native_wind_speed=maybe_float(hourly.get("windSpeed")),
-                native_dew_point=maybe_float(hourly.get("dew")),
+                native_wind_speed=self._wind_speed(hourly.get("windSpeed")),
+                native_dew_point=self._temperature(hourly.get("dew")),
                 # uv_index=,
-                # is_daytime=,
+                is_daytime=self._is_daytime(hourly.get("fxTime")),
             )
-            for hourly in weather_hourly
+            for hourly in weather_hourly or []
         ]
 
+    def _is_daytime(self, fx_time: str | None) -> bool | None:
+        moment = dt_util.parse_datetime(fx_time) if fx_time else None
+        return self.coordinators.ephemeris.is_daytime(moment) if moment else None
+
     @callback
     def _async_forecast_daily(self) -> list[Forecast] | None:
         """Return the daily forecast in native units."""
+        self._async_update_units()
         return self._forecast_daily
 
     @callback
     def _async_forecast_hourly(self) -> list[Forecast] | None:
         """Return the hourly forecast in native units."""
+        self._async_update_units()
         return self._forecast_hourly
 
     @callback
@@ -217,12 +369,20 @@ class QWeatherEntity(CoordinatorWeatherEntity):
         """Handle updated data from the air now coordinator."""
         _LOGGER.debug("_handle_air_now_coordinator_update")
         self._update_air_now(self.coordinators.air_now.data)
-        self.async_write_ha_state()
+        self._async_schedule_write()
 
     @callback
     def _update_air_now(self, air_now: AirNow | None):
         self._attr_ozone = maybe_float(air_now.get("o3")) if air_now else None
 
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        return {
+            **(getattr(self, "_attr_extra_state_attributes", None) or {}),
+            **self.coordinators.observation.stale_attributes,
+            "saved_writes": self.saved_writes,
+        }
+
     @callback
     def _update_extra_weather_now(self, weather_now: RealtimeWeather | None):
         if not weather_now:
@@ -304,6 +464,30 @@ CONDITION_MAP = {
 # region Utils
 
 
+def _log_blocking(
+    forecast_type: str, forecast: list[Forecast] | None, started: float
+) -> None:
+    _LOGGER.debug(
+        "Built %s forecast of %d items, blocked the event loop for %.2f ms",
+        forecast_type,
+        len(forecast or []),
+        (time.perf_counter() - started) * 1000,
+    )
+
+
+def convert(
+    value: str | None,
+    converter: type[BaseUnitConverter],
+    from_unit: str,
+    to_unit: str,
+) -> float | None:
+    if value is None:
+        return None
+    if from_unit == to_unit:
+        return float(value)
+    return converter.convert(float(value), from_unit, to_unit)
+
+
 def maybe_int(s: int | None) -> int | None:
     return None if s is None else int(s)
 
@@ -0,0 +1,139 @@
+# ruff: noqa: INP001, T201
+"""Measure how much the QWeather integration adds to Home Assistant's bootstrap.
+
+Import time: every module is imported in a fresh interpreter after the Home
+Assistant modules that are loaded anyway, so only the integration's own cost is
+counted. The whole integration is timed as well, and with ``--against`` the same
+is done for an earlier commit, e.g. to compare with the baseline:
+
+    python scripts/benchmark_startup.py --against 079dcac
+
+Setup time and coalesced state writes: read from a Home Assistant log with
+debug logging enabled for ``custom_components.qweather``, e.g.:
+
+    python scripts/benchmark_startup.py --log config/home-assistant.log
+"""
+
+import argparse
+from pathlib import Path
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Imported before timing, Home Assistant loads these for itself anyway. The
+# weather component is left out: only this integration loads it.
+BASELINE = [
+    "aiohttp",
+    "voluptuous",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity_registry",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.components.binary_sensor",
+    "homeassistant.components.sensor",
+]
+
+MODULES = [
+    "custom_components.qweather",
+    "custom_components.qweather.config_flow",
+    "custom_components.qweather.binary_sensor",
+    "custom_components.qweather.sensor",
+    "custom_components.qweather.weather",
+]
+
+TIMER = """
+import importlib, sys, time
+for name in {baseline!r}:
+    importlib.import_module(name)
+for name in {parents!r}:
+    importlib.import_module(name)
+started = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+print(time.perf_counter() - started)
+"""
+
+SETUP_LINE = re.compile(
+    r"Setup took (?P<seconds>[\d.]+)s, platforms: (?P<platforms>.*)"
+)
+COALESCE_LINE = re.compile(
+    r"(?P<entity_id>weather\.\S+) coalesced .*\((?P<saved>\d+) writes saved in total\)"
+)
+
+
+def time_import(modules: list[str], parents: list[str], root: Path) -> float:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            TIMER.format(baseline=BASELINE, parents=parents, modules=modules),
+        ],
+        cwd=root,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return float(result.stdout.strip())
+
+
+def report_imports(root: Path, runs: int) -> float:
+    """Print the import time of every module, return the whole integration's."""
+    for module in MODULES:
+        parents = MODULES[:1] if module != MODULES[0] else []
+        median = statistics.median(
+            time_import([module], parents, root) for _ in range(runs)
+        )
+        print(f"  {module:45} {median * 1000:8.2f} ms")
+    total = statistics.median(time_import(MODULES, [], root) for _ in range(runs))
+    print(f"  {'whole integration':45} {total * 1000:8.2f} ms")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--log", type=Path, help="home-assistant.log to scan")
+    parser.add_argument("--against", help="commit to compare the import time with")
+    args = parser.parse_args()
+
+    print("Import time (median, integration code only):")
+    total = report_imports(ROOT, args.runs)
+
+    if args.against:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = subprocess.run(
+                ["git", "archive", args.against, "custom_components"],
+                cwd=ROOT,
+                capture_output=True,
+                check=True,
+            )
+            subprocess.run(["tar", "-x", "-C", tmp], input=archive.stdout, check=True)
+            print(f"Import time at {args.against}:")
+            before = report_imports(Path(tmp), args.runs)
+        print(f"Whole integration: {(total - before) * 1000:+.2f} ms")
+
+    if args.log:
+        print("Setup time (async_setup_entry, from log):")
+        for line in args.log.read_text(encoding="utf-8").splitlines():
+            if match := SETUP_LINE.search(line):
+                print(
+                    f"  {float(match['seconds']) * 1000:8.2f} ms  {match['platforms']}"
+                )
+        # Running totals per entity, the last one of each is its total.
+        saved = {
+            match["entity_id"]: int(match["saved"])
+            for line in args.log.read_text(encoding="utf-8").splitlines()
+            if (match := COALESCE_LINE.search(line))
+        }
+        print(f"Weather state writes saved by coalescing: {sum(saved.values())}")
+        for entity_id, count in saved.items():
+            print(f"  {entity_id:45} {count:8d}")
+
+
+if __name__ == "__main__":
+    main()